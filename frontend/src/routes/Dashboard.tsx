@@ -57,17 +57,11 @@ export default function Dashboard() {
 
   const complianceScoreChartData = complianceData
     ? {
-        labels: ['0-20', '21-40', '41-60', '61-80', '81-100'],
+        labels: Object.keys(complianceData.score_histogram),
         datasets: [
           {
             label: 'Compliance Score Distribution',
-            data: [
-              complianceData.scores.filter(s => s <= 20).length,
-              complianceData.scores.filter(s => s > 20 && s <= 40).length,
-              complianceData.scores.filter(s => s > 40 && s <= 60).length,
-              complianceData.scores.filter(s => s > 60 && s <= 80).length,
-              complianceData.scores.filter(s => s > 80).length
-            ],
+            data: Object.values(complianceData.score_histogram),
             backgroundColor: '#388e3c'
           }
         ]
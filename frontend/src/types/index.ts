@@ -49,7 +49,7 @@ export interface Conversation {
     total_conversations: number;
     compliant_conversations: number;
     rule_violations: Record<string, number>;
-    scores: number[];
+    score_histogram: Record<string, number>;
   }
   
   export interface EmotionAnalytics {
@@ -6,9 +6,16 @@ const api = axios.create({
   headers: { 'Content-Type': 'application/json' }
 });
 
+// The list is paged newest first; follow X-Next-Cursor until the last page
 export const fetchConversations = async (): Promise<Conversation[]> => {
-  const response = await api.get('/conversations');
-  return response.data;
+  const conversations: Conversation[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await api.get('/conversations', { params: cursor ? { cursor } : undefined });
+    conversations.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return conversations;
 };
 
 export const fetchConversation = async (id: string): Promise<ConversationDetail> => {
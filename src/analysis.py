@@ -1,57 +1,435 @@
 import os
-from transformers import pipeline
-from typing import List, Dict, Union
+import threading
+import time
+import numpy as np
+from datetime import datetime
+from typing import List, Dict, Tuple, Union
 import logging
+import config
+import metrics
+from backends import load_backend
+from batching import MicroBatcher
+from inference_pool import InferencePool, InferencePoolBusy
+from cache import EmotionCache, model_identity
+import logs
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+AGGREGATIONS = ("mean", "max", "length_weighted")
+
+# Call-center style lines used to compare backends against the torch reference
+PARITY_SAMPLES = [
+    "Hi Alex! Welcome to VoiceUp Support. How can I help you?",
+    "My internet keeps disconnecting and it's really frustrating!",
+    "I'm so sorry for the inconvenience. Let me check this for you.",
+    "Yes, it's working now. Thank you!",
+    "Are you sure? This has been happening for an hour.",
+    "What do you want?",
+    "This is terrible service!",
+    "Our network never has issues, must be your device.",
+    "I'm worried my account was hacked, I see charges I didn't make.",
+    "Wow, I didn't expect it to be fixed that quickly.",
+    "That's disgusting, nobody should be treated like this.",
+    "Okay.",
+]
+
 class EmotionAnalyzer:
-    def __init__(self):
-        try:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            self.model_path = os.path.join(os.path.dirname(current_dir), "models", "emotion-model")
-            
-            if not os.path.exists(self.model_path):
-                raise FileNotFoundError(
-                    f"Model not found at {self.model_path}. "
-                    "Please run download_model.py first to download the model."
-                )
-            
-            logger.info(f"Loading model from {self.model_path}")
-            self.classifier = pipeline(
-                task="text-classification",
-                model=self.model_path,
-                tokenizer=self.model_path,
-                top_k=None
-            )
-            logger.info("Model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize EmotionAnalyzer: {str(e)}")
-            raise
-    
+    """Emotion classifier whose tokenizer and weights load on first use.
+
+    Constructing one is cheap; load() (called implicitly by every analysis
+    method) does the heavy work once, thread-safely, and optionally runs a
+    warmup pass so the first real request does not pay for lazy allocations.
+    """
+
+    def __init__(self, batching: bool = config.ANALYZER_BATCHING,
+                 max_batch_size: int = config.ANALYZER_MAX_BATCH_SIZE,
+                 max_wait_ms: float = config.ANALYZER_MAX_WAIT_MS,
+                 cache_size: int = config.EMOTION_CACHE_SIZE,
+                 cache_path: str = config.EMOTION_CACHE_PATH,
+                 backend: str = config.ANALYZER_BACKEND,
+                 warmup_iterations: int = config.ANALYZER_WARMUP_ITERATIONS,
+                 num_threads: int = config.INFERENCE_THREADS,
+                 pool_size: int = config.INFERENCE_POOL_SIZE,
+                 model_path: str = config.MODEL_PATH):
+        self.model_path = model_path
+        self.backend_name = backend
+        self.warmup_iterations = warmup_iterations
+        self.num_threads = num_threads
+        self.pool_size = pool_size
+        self.pool = None
+        self.batcher = MicroBatcher(self._classify_batch, max_batch_size, max_wait_ms) if batching else None
+        self._cache_size = cache_size
+        self._cache_path = cache_path
+        self.cache = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        # Separate from _load_lock, which a synchronous load() holds for its whole duration
+        self._loader_lock = threading.Lock()
+        self._loader = None
+        self.load_error = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.warmed_up = False
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded
+
+    @property
+    def labels(self) -> List[str]:
+        self.load()
+        return self._labels
+
+    @property
+    def model_version(self) -> str:
+        self.load()
+        return self._model_version
+
+    def load(self) -> "EmotionAnalyzer":
+        """Load tokenizer, backend and labels once; later calls return immediately."""
+        if self._loaded:
+            return self
+        with self._load_lock:
+            if self._loaded:
+                return self
+            try:
+                started = time.perf_counter()
+                if not os.path.exists(self.model_path):
+                    raise FileNotFoundError(
+                        f"Model not found at {self.model_path}. "
+                        "Please run download_model.py first to download the model."
+                    )
+
+                logger.info(f"Loading model from {self.model_path}")
+                from transformers import AutoConfig, AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+                model_config = AutoConfig.from_pretrained(self.model_path)
+                self._labels = [model_config.id2label[i] for i in range(model_config.num_labels)]
+                if self.pool_size:
+                    # Weights live only in the pool's worker processes; this process just tokenizes
+                    self.backend = None
+                    self.pool = InferencePool(
+                        self.pool_size, len(self._labels),
+                        threads=config.INFERENCE_POOL_THREADS,
+                        max_pending=config.INFERENCE_POOL_MAX_PENDING,
+                        max_rows=config.ANALYZER_MAX_BATCH_SIZE,
+                        timeout=config.INFERENCE_POOL_TIMEOUT,
+                        restart_backoff=config.INFERENCE_POOL_RESTART_BACKOFF,
+                        max_restart_backoff=config.INFERENCE_POOL_RESTART_BACKOFF_MAX,
+                        max_restarts=config.INFERENCE_POOL_MAX_RESTARTS,
+                        backend=self.backend_name
+                    )
+                else:
+                    self.backend = load_backend(self.model_path, self.backend_name, self.num_threads)
+                self._label_index = {label: i for i, label in enumerate(self._labels)}
+                max_length = self.tokenizer.model_max_length
+                # Tokenizers without a configured limit report a huge sentinel value
+                self.max_length = max_length if max_length and max_length <= 4096 else 512
+                # Quantized or exported graphs score differently, so they get their own version
+                identity = model_identity(self.model_path)
+                self._model_version = identity if self.backend_name == "torch" else f"{identity}-{self.backend_name}"
+                if self._cache_size or self._cache_path:
+                    self.cache = EmotionCache(self._model_version, self._cache_size, self._cache_path)
+                self._loaded = True
+                self.load_error = None
+                self.loaded_at = datetime.utcnow()
+                self.load_seconds = round(time.perf_counter() - started, 3)
+                logger.info(f"Model loaded successfully in {self.load_seconds}s")
+            except Exception as e:
+                self.load_error = str(e)
+                logger.error(f"Failed to initialize EmotionAnalyzer: {str(e)}")
+                raise
+        return self
+
+    @property
+    def loading(self) -> bool:
+        return self._loader is not None and self._loader.is_alive()
+
+    def load_async(self) -> threading.Thread:
+        """Load and warm up in a background thread so importing the app never blocks.
+
+        Returns the running loader instead of starting a second one.
+        """
+        def run():
+            try:
+                self.load()
+                self.warmup()
+            except Exception:
+                pass  # recorded in load_error and surfaced by the readiness endpoint
+        with self._loader_lock:
+            if not self.loading:
+                self._loader = threading.Thread(target=run, name="emotion-model-loader", daemon=True)
+                self._loader.start()
+            return self._loader
+
+    def warmup(self, iterations: int = None) -> None:
+        """Run a few throwaway forward passes at different batch shapes."""
+        iterations = self.warmup_iterations if iterations is None else iterations
+        if iterations <= 0:
+            return
+        started = time.perf_counter()
+        for _ in range(iterations):
+            self.predict_proba(PARITY_SAMPLES[:1])
+            self.predict_proba(PARITY_SAMPLES)
+        self.warmed_up = True
+        logger.info(f"Warmup finished in {time.perf_counter() - started:.3f}s")
+
+    def status(self) -> Dict:
+        return {
+            "ready": self._loaded and (self.pool is None or self.pool.ready),
+            "backend": self.backend_name,
+            "model_version": self._model_version if self._loaded else None,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "load_seconds": self.load_seconds,
+            "warmed_up": self.warmed_up,
+            "loading": self.loading,
+            "error": self.load_error,
+            "pid": os.getpid(),
+            "pool": self.pool.health() if self.pool is not None else None
+        }
+
+    def _classify_batch(self, texts: List[str]) -> List[List[Dict[str, Union[str, float]]]]:
+        """Run one forward pass over texts and return one [{label, score}, ...] list per text."""
+        probs = self.predict_proba(texts)
+        with metrics.stage("postprocess"):
+            return [self.to_emotions(row) for row in probs]
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """Label probabilities [n, labels] for texts, truncated to the model limit, in one forward pass."""
+        self.load()
+        if self.pool is not None:
+            with metrics.stage("forward"):
+                return self.pool.predict_proba(texts)
+        with metrics.stage("tokenize"):
+            batch = self.tokenizer(list(texts), padding=True, truncation=True, max_length=self.max_length,
+                                   return_tensors=self.backend.tensor_type)
+        # Lengths are post-truncation, so rows at the limit are the truncated ones (or exact fits)
+        metrics.record_tokens(np.asarray(batch["attention_mask"]).sum(axis=1), self.max_length, "truncated")
+        with metrics.stage("forward"):
+            return self.backend(batch)
+
     def analyze_text(self, text: str) -> List[List[Dict[str, Union[str, float]]]]:
         """Analyze text and return emotion scores in [[{label, score}, ...]] format."""
         try:
             if not text or not isinstance(text, str) or not text.strip():
                 logger.warning("Empty or invalid text provided")
                 return [[]]
-            
-            logger.debug(f"Analyzing text: {text[:50]}...")
-            results = self.classifier(text)
-            formatted_results = [[
-                {
-                    'label': result['label'],
-                    'score': round(float(result['score']), 4)
-                }
-                for result in results[0]
-            ]]
-            logger.debug(f"Classifier output: {formatted_results}")
+
+            logger.debug("Analyzing text: %s", logs.Text(text))
+            self.load()
+            cached = self.cache.get(text) if self.cache is not None else None
+            if cached is not None:
+                formatted_results = [cached]
+            elif self.batcher is not None:
+                formatted_results = [self.batcher.submit(text)]
+            else:
+                formatted_results = self._classify_batch([text])
+            if cached is None and self.cache is not None:
+                self.cache.put(text, formatted_results[0])
+            logs.debug_payload(logger, "Classifier output: %s", formatted_results)
             return formatted_results
+        except InferencePoolBusy:
+            raise
         except Exception as e:
             logger.error(f"Error analyzing text: {str(e)}")
             return [[]]
 
-# Create the classifier instance
-classifier = EmotionAnalyzer().analyze_text
\ No newline at end of file
+    def analyze_batch(self, texts: List[str], batch_size: int = None) -> List[Union[List[Dict[str, Union[str, float]]], Exception]]:
+        """Classify many texts in length-sorted batches.
+
+        Returns one [{label, score}, ...] list per text in input order. Texts that are
+        empty, invalid or fail inference get an Exception in their slot instead, so one
+        bad item never fails the rest of the batch.
+        """
+        self.load()
+        batch_size = max(1, batch_size or config.ANALYZER_MAX_BATCH_SIZE)
+        results = [None] * len(texts)
+        valid = []
+        for i, text in enumerate(texts):
+            if not text or not isinstance(text, str) or not text.strip():
+                results[i] = ValueError("Empty or invalid text")
+            else:
+                valid.append(i)
+
+        known = self.cache.get_many([texts[i] for i in valid]) if self.cache is not None else {}
+        # Identical texts are classified once per call
+        pending = sorted({texts[i] for i in valid if texts[i] not in known}, key=len)
+        computed = {}
+        # Sorting by length keeps similar-sized texts together so each batch pads little
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            try:
+                outputs = self._classify_batch(chunk)
+            except InferencePoolBusy:
+                raise
+            except Exception as e:
+                logger.warning(f"Batch of {len(chunk)} texts failed, retrying individually: {str(e)}")
+                outputs = []
+                for text in chunk:
+                    try:
+                        outputs.extend(self._classify_batch([text]))
+                    except Exception as item_error:
+                        outputs.append(item_error)
+            computed.update(zip(chunk, outputs))
+
+        if self.cache is not None:
+            self.cache.put_many({text: output for text, output in computed.items() if not isinstance(output, Exception)})
+        for i in valid:
+            text = texts[i]
+            results[i] = known[text] if text in known else computed[text]
+        return results
+
+    def _forward(self, sequences: List[List[int]]) -> np.ndarray:
+        """One forward pass over token id sequences (special tokens included); returns label probabilities."""
+        with metrics.stage("forward"):
+            batch = self.tokenizer.pad({"input_ids": sequences}, padding=True, return_tensors=self.backend.tensor_type)
+            return self.backend(batch)
+
+    def classify_sequences(self, sequences: List[List[int]], batch_size: int = None) -> np.ndarray:
+        """Classify sequences in length-bucketed batches capped by count and padded token volume."""
+        self.load()
+        if self.pool is not None:
+            # Sort before the pool splits into chunks so each worker batch pads little
+            order = sorted(range(len(sequences)), key=lambda i: len(sequences[i]))
+            probs = np.zeros((len(sequences), len(self.labels)), dtype=np.float32)
+            with metrics.stage("forward"):
+                probs[order] = self.pool.classify_sequences([sequences[i] for i in order])
+            return probs
+        batch_size = max(1, batch_size or config.ANALYZER_MAX_BATCH_SIZE)
+        probs = np.zeros((len(sequences), len(self.labels)), dtype=np.float32)
+        batch, longest = [], 0
+        for i in sorted(range(len(sequences)), key=lambda i: len(sequences[i])):
+            length = len(sequences[i])
+            if batch and (len(batch) >= batch_size or max(longest, length) * (len(batch) + 1) > config.ANALYZER_MAX_BATCH_TOKENS):
+                probs[batch] = self._forward([sequences[j] for j in batch])
+                batch, longest = [], 0
+            batch.append(i)
+            longest = max(longest, length)
+        if batch:
+            probs[batch] = self._forward([sequences[j] for j in batch])
+        return probs
+
+    def message_scores(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score every message on its own.
+
+        Each text is tokenized once; texts longer than the model limit are split into
+        windows that are all classified and averaged by token count, so nothing is
+        truncated. Returns (probabilities [n, labels] in self.labels order, token
+        counts [n]); empty texts get a zero row and a count of 0.
+        """
+        self.load()
+        tokenizer = self.tokenizer
+        probs = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        lengths = np.zeros(len(texts), dtype=np.int64)
+        valid = [i for i, text in enumerate(texts) if isinstance(text, str) and text.strip()]
+        if not valid:
+            return probs, lengths
+
+        with metrics.stage("tokenize"):
+            token_ids = tokenizer([texts[i] for i in valid], add_special_tokens=False, truncation=False, verbose=False)["input_ids"]
+        for i, ids in zip(valid, token_ids):
+            lengths[i] = len(ids)
+        window = self.max_length - tokenizer.num_special_tokens_to_add(pair=False)
+        # Texts longer than one window are split rather than truncated
+        metrics.record_tokens(lengths[valid], window + 1, "windowed")
+
+        known = self.cache.get_many([texts[i] for i in valid]) if self.cache is not None else {}
+        sequences, owners = [], []
+        for i, ids in zip(valid, token_ids):
+            if texts[i] in known:
+                probs[i] = self.to_vector(known[texts[i]])
+                continue
+            for start in range(0, max(len(ids), 1), window):
+                sequences.append(tokenizer.build_inputs_with_special_tokens(ids[start:start + window]))
+                owners.append((i, max(len(ids[start:start + window]), 1)))
+
+        if sequences:
+            chunk_probs = self.classify_sequences(sequences)
+            with metrics.stage("postprocess"):
+                weights = np.zeros(len(texts), dtype=np.float64)
+                fresh = np.zeros_like(probs, dtype=np.float64)
+                for (i, weight), row in zip(owners, chunk_probs):
+                    fresh[i] += row * weight
+                    weights[i] += weight
+                computed = weights > 0
+                probs[computed] = (fresh[computed] / weights[computed][:, None]).astype(np.float32)
+                if self.cache is not None:
+                    self.cache.put_many({texts[i]: self.to_emotions(probs[i]) for i in np.flatnonzero(computed)})
+        return probs, lengths
+
+    @staticmethod
+    def aggregate(probs: np.ndarray, lengths: np.ndarray, aggregation: str = "mean") -> np.ndarray:
+        """Combine per-message probabilities into one conversation-level vector."""
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation '{aggregation}', expected one of {', '.join(AGGREGATIONS)}")
+        mask = lengths > 0
+        if not mask.any():
+            return np.zeros(probs.shape[1], dtype=np.float32)
+        scores = probs[mask]
+        if aggregation == "max":
+            return scores.max(axis=0)
+        if aggregation == "length_weighted":
+            weights = lengths[mask].astype(np.float64)
+            return (scores * weights[:, None]).sum(axis=0) / weights.sum()
+        return scores.mean(axis=0)
+
+    def to_emotions(self, vector: np.ndarray) -> List[Dict[str, Union[str, float]]]:
+        """Convert a probability vector into [{label, score}, ...] sorted by score."""
+        emotions = [{'label': label, 'score': round(float(score), 4)} for label, score in zip(self.labels, vector)]
+        return sorted(emotions, key=lambda item: item['score'], reverse=True)
+
+    def to_vector(self, emotions: List[Dict[str, Union[str, float]]]) -> np.ndarray:
+        """Inverse of to_emotions: a probability vector in self.labels order."""
+        vector = np.zeros(len(self.labels), dtype=np.float32)
+        for item in emotions:
+            vector[self._label_index[item['label']]] = item['score']
+        return vector
+
+    def analyze_conversation(self, texts: List[str], aggregation: str = None) -> Tuple[List[Dict], List[List[Dict]]]:
+        """Classify each message and aggregate; returns (summary emotions, per-message emotions)."""
+        aggregation = aggregation or config.CONVERSATION_AGGREGATION
+        probs, lengths = self.message_scores(texts)
+        summary = self.aggregate(probs, lengths, aggregation)
+        per_message = [self.to_emotions(row) if length else [] for row, length in zip(probs, lengths)]
+        return self.to_emotions(summary), per_message
+
+    def stats(self, reset: bool = False) -> Dict:
+        """Micro-batching (batch size, queue wait) and result-cache statistics."""
+        stats = {"batching": False}
+        if self.batcher is not None:
+            stats = {"batching": True, **self.batcher.stats(reset=reset)}
+        stats["cache"] = self.cache.stats() if self.cache is not None else None
+        return stats
+
+def parity_report(backend: str, texts: List[str] = None, reference: str = "torch") -> Dict:
+    """Compare a backend's scores with the reference backend on a sample set.
+
+    Reports the maximum and mean absolute score deviation and how often the
+    top emotion agrees, i.e. the accuracy traded for the faster backend.
+    """
+    texts = texts or PARITY_SAMPLES
+    candidate = EmotionAnalyzer(batching=False, cache_size=0, cache_path=None, backend=backend)
+    baseline = EmotionAnalyzer(batching=False, cache_size=0, cache_path=None, backend=reference)
+    expected = baseline.predict_proba(texts)
+    actual = candidate.predict_proba(texts)
+    deviation = np.abs(actual - expected)
+    worst = int(deviation.max(axis=1).argmax())
+    return {
+        "backend": backend,
+        "reference": reference,
+        "samples": len(texts),
+        "max_abs_deviation": round(float(deviation.max()), 6),
+        "mean_abs_deviation": round(float(deviation.mean()), 6),
+        "top1_agreement": round(float((actual.argmax(axis=1) == expected.argmax(axis=1)).mean()), 4),
+        "worst_sample": texts[worst]
+    }
+
+# Create the classifier instance; the model itself loads according to VOICEUP_MODEL_LOADING
+analyzer = EmotionAnalyzer()
+classifier = analyzer.analyze_text
+
+if config.MODEL_LOADING == "preload":
+    # Load in the importing (gunicorn master) process so forked workers share the weights
+    analyzer.load()
+elif config.MODEL_LOADING == "background":
+    analyzer.load_async()
@@ -0,0 +1,265 @@
+import sys
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+import config
+from app import app as flask_app
+
+logger = logging.getLogger(__name__)
+
+# Endpoints that run the model; everything else shares the read limits
+INFERENCE_ENDPOINTS = {
+    'analyze_text', 'analyze_text_batch', 'predict_top_emotion',
+    'analyze_conversation', 'analyze_message', 'add_live_turn'
+}
+
+# Long-lived responses; kept apart so open streams cannot use up the read slots
+STREAM_ENDPOINTS = {'live_events'}
+
+class _Abandoned(Exception):
+    """The request timed out or the client left; the worker thread stops writing."""
+
+class _Lane:
+    """A route class with its own threads, concurrency limit and default timeout."""
+
+    def __init__(self, name, concurrency, timeout):
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"asgi-{name}")
+        self.semaphore = None
+        self.active = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+class _Exchange:
+    """Bridges one WSGI call running on an executor thread to the ASGI connection."""
+
+    def __init__(self, loop, receive, send):
+        self.loop = loop
+        self.receive = receive
+        self.send = send
+        self.started = asyncio.Event()
+        self.abandoned = False
+        self.headers_sent = False
+        self.status = None
+        self.headers = None
+        self._buffer = b""
+        self._more_body = True
+
+    # Runs on the event loop, so it never races with the timeout path
+    async def _send(self, message):
+        if self.abandoned:
+            raise _Abandoned()
+        await self.send(message)
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info and self.headers_sent:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(" ", 1)[0])
+        self.headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        self.loop.call_soon_threadsafe(self.started.set)
+        return self.write
+
+    def write(self, data, more_body=True):
+        if not self.headers_sent:
+            self._call(self._send({"type": "http.response.start", "status": self.status, "headers": self.headers}))
+            self.headers_sent = True
+        if data or not more_body:
+            self._call(self._send({"type": "http.response.body", "body": data, "more_body": more_body}))
+
+    # wsgi.input: pulls request body chunks from ASGI receive() on demand
+    def _fill(self, size):
+        while self._more_body and (size < 0 or len(self._buffer) < size):
+            message = self._call(self.receive())
+            if message["type"] == "http.disconnect":
+                self._more_body = False
+                break
+            self._buffer += message.get("body", b"")
+            self._more_body = message.get("more_body", False)
+
+    def read(self, size=-1):
+        self._fill(size)
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        while b"\n" not in self._buffer and self._more_body and (size < 0 or len(self._buffer) < size):
+            self._fill(len(self._buffer) + 1)
+        end = self._buffer.find(b"\n") + 1 or len(self._buffer)
+        if size >= 0:
+            end = min(end, size)
+        data, self._buffer = self._buffer[:end], self._buffer[end:]
+        return data
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def run(self, wsgi_app, environ):
+        environ["wsgi.input"] = self
+        result = wsgi_app(environ, self.start_response)
+        try:
+            for chunk in result:
+                self.write(chunk)
+            self.write(b"", more_body=False)
+        except _Abandoned:
+            pass
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+def _environ(scope):
+    headers = {}
+    for name, value in scope["headers"]:
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = f"HTTP_{key}"
+        headers[key] = f"{headers[key]},{value}" if key in headers else value
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    return {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        # Bodies without Content-Length (chunked NDJSON uploads) are read to the end
+        "wsgi.input_terminated": True,
+        **headers
+    }
+
+class VoiceUpASGI:
+    """ASGI entry point serving the Flask routes of app.py.
+
+    Each request runs the unchanged Flask view on an executor thread; the event
+    loop only moves bytes. Inference routes and everything else get separate
+    thread pools and separate limits, so saturated analyze endpoints cannot
+    take the threads (or database connections) reads need, and event streams,
+    which hold their thread while open, get a lane of their own. A request that
+    cannot get a slot within the queue timeout gets 503; one whose view has not
+    produced a response within its route timeout gets 504 (the thread keeps
+    its slot until the view returns, so the limit stays honest). Streaming
+    responses are only timed until their headers are ready.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.lanes = {
+            'inference': _Lane('inference', config.ASGI_INFERENCE_CONCURRENCY, config.ASGI_INFERENCE_TIMEOUT),
+            'read': _Lane('read', config.ASGI_READ_CONCURRENCY, config.ASGI_READ_TIMEOUT),
+            'stream': _Lane('stream', config.ASGI_STREAM_CONCURRENCY, config.ASGI_STREAM_TIMEOUT)
+        }
+        self.route_timeouts = dict(config.ASGI_ROUTE_TIMEOUTS)
+
+    def route(self, environ):
+        """(lane, timeout) for a request, from the Flask endpoint it will hit."""
+        try:
+            endpoint, _ = self.wsgi_app.url_map.bind_to_environ(environ).match()
+        except (HTTPException, RequestRedirect):
+            endpoint = None
+        if endpoint in INFERENCE_ENDPOINTS:
+            lane = self.lanes['inference']
+        elif endpoint in STREAM_ENDPOINTS:
+            lane = self.lanes['stream']
+        else:
+            lane = self.lanes['read']
+        return lane, self.route_timeouts.get(endpoint, lane.timeout)
+
+    def stats(self):
+        return {name: {
+            'concurrency': lane.concurrency,
+            'active': lane.active,
+            'rejected': lane.rejected,
+            'timed_out': lane.timed_out,
+            'timeout': lane.timeout
+        } for name, lane in self.lanes.items()}
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for lane in self.lanes.values():
+                    lane.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _reply(self, send, status, body, retry_after=None):
+        headers = [(b"content-type", b"application/json")]
+        if retry_after:
+            headers.append((b"retry-after", str(retry_after).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        environ = _environ(scope)
+        lane, timeout = self.route(environ)
+        if lane.semaphore is None:
+            # Created lazily so it binds to the server's event loop
+            lane.semaphore = asyncio.Semaphore(lane.concurrency)
+        try:
+            await asyncio.wait_for(lane.semaphore.acquire(), config.ASGI_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            lane.rejected += 1
+            return await self._reply(send, 503, b'{"error": "Server busy, retry shortly"}', retry_after=1)
+
+        loop = asyncio.get_running_loop()
+        exchange = _Exchange(loop, receive, send)
+        lane.active += 1
+        future = loop.run_in_executor(lane.executor, exchange.run, self.wsgi_app, environ)
+
+        def release(_):
+            lane.active -= 1
+            lane.semaphore.release()
+        future.add_done_callback(release)
+
+        started = asyncio.ensure_future(exchange.started.wait())
+        done, _ = await asyncio.wait({started, future}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            started.cancel()
+            exchange.abandoned = True
+            lane.timed_out += 1
+            logger.warning(f"{environ['REQUEST_METHOD']} {environ['PATH_INFO']} timed out after {timeout}s")
+            return await self._reply(send, 504, b'{"error": "Request timed out"}')
+        started.cancel()
+        try:
+            await future
+        except Exception as e:
+            logger.error(f"Unhandled error serving {environ['PATH_INFO']}: {str(e)}")
+            if not exchange.headers_sent:
+                await self._reply(send, 500, b'{"error": "Internal server error"}')
+
+app = VoiceUpASGI(flask_app)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    host, port = config.ASGI_BIND.rsplit(":", 1)
+    uvicorn.run(app, host=host, port=int(port))
@@ -0,0 +1,73 @@
+import os
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnx-fp32", "onnx-int8")
+
+# Exported graphs live next to the weights, under models/emotion-model/onnx/
+ONNX_DIR = "onnx"
+ONNX_FILES = {
+    "onnx-fp32": "model.onnx",
+    "onnx-int8": "model-int8.onnx"
+}
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+class TorchBackend:
+    """The PyTorch sequence-classification model."""
+
+    tensor_type = "pt"
+
+    def __init__(self, model_path, num_threads=0):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self._torch = torch
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_path)
+        self.model.eval()
+
+    def __call__(self, batch):
+        with self._torch.no_grad():
+            logits = self.model(**batch).logits
+        return self._torch.softmax(logits, dim=-1).numpy()
+
+class OnnxBackend:
+    """ONNX Runtime session over an exported fp32 or dynamically quantized int8 graph."""
+
+    tensor_type = "np"
+
+    def __init__(self, model_path, backend="onnx-fp32", num_threads=0):
+        import onnxruntime as ort
+
+        onnx_path = os.path.join(model_path, ONNX_DIR, ONNX_FILES[backend])
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"ONNX model not found at {onnx_path}. "
+                "Please run download_model.py --export-onnx first."
+            )
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def __call__(self, batch):
+        feeds = {name: np.asarray(batch[name], dtype=np.int64) for name in self.input_names if name in batch}
+        logits = self.session.run(None, feeds)[0]
+        return _softmax(logits.astype(np.float32))
+
+def load_backend(model_path, backend="torch", num_threads=0):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    logger.info(f"Loading {backend} backend from {model_path}")
+    if backend == "torch":
+        return TorchBackend(model_path, num_threads)
+    return OnnxBackend(model_path, backend, num_threads)
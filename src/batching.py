@@ -0,0 +1,142 @@
+import os
+import queue
+import threading
+import time
+import logging
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class _PendingItem:
+    __slots__ = ("text", "enqueued_at", "profile", "done", "result", "error")
+
+    def __init__(self, text):
+        self.text = text
+        self.enqueued_at = time.perf_counter()
+        # The caller's request profile; the batch runs on another thread
+        self.profile = metrics.current_profile.get()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class MicroBatcher:
+    """Groups concurrent single-text requests into one batched forward pass.
+
+    Callers block in submit() while a background thread drains the queue into
+    batches capped by max_batch_size and max_wait_ms (measured from the arrival
+    of the oldest item in the batch), runs predict_fn once per batch and hands
+    every caller its own result. Profiled callers get the stage times of the
+    batch they were part of, plus their own queue wait as batch_wait.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=10.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._batch_sizes = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so a forked worker process starts its own.
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid != pid:
+                self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._run, name="emotion-microbatcher", daemon=True)
+            self._worker_pid = pid
+            self._worker.start()
+
+    def submit(self, text):
+        self._ensure_worker()
+        item = _PendingItem(text)
+        self._queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            profiled = [item for item in batch if item.profile is not None]
+            profile = metrics.Profile() if profiled else None
+            token = metrics.current_profile.set(profile)
+            try:
+                results = self.predict_fn([item.text for item in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} inputs")
+                for item, result in zip(batch, results):
+                    item.result = result
+            except Exception as e:
+                logger.error(f"Batched inference failed for {len(batch)} texts: {str(e)}")
+                for item in batch:
+                    item.error = e
+            finally:
+                metrics.current_profile.reset(token)
+            self._record(batch, started)
+            for item in profiled:
+                item.profile.add("batch_wait", started - item.enqueued_at)
+                for name, seconds in profile.stages.items():
+                    item.profile.add(name, seconds, profile.counts[name])
+            for item in batch:
+                item.done.set()
+
+    def _record(self, batch, started):
+        size = len(batch)
+        waits = [started - item.enqueued_at for item in batch]
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._max_batch = max(self._max_batch, size)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self, reset=False):
+        with self._lock:
+            stats = {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 3) if self._batches else 0,
+                "largest_batch": self._max_batch,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+                "avg_queue_wait_ms": round(self._wait_total / self._items * 1000, 3) if self._items else 0,
+                "max_queue_wait_ms": round(self._wait_max * 1000, 3)
+            }
+            if reset:
+                self._reset_stats()
+        return stats
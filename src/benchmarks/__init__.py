@@ -0,0 +1,10 @@
+"""Performance benchmarks for the VoiceUp backend.
+
+Run from src/ (the modules import the app's flat modules directly):
+
+    python -m benchmarks.corpus --conversations 100000 --output corpus.ndjson
+    python -m benchmarks.tiny_model ../models/tiny-emotion-model
+    python -m benchmarks.run --output results.json --compare baseline.json
+    python -m benchmarks.load --url http://127.0.0.1:5000 --duration 30
+    python -m benchmarks.plans --seed 200000
+"""
@@ -0,0 +1,171 @@
+import re
+import sys
+import gzip
+import json
+import math
+import random
+import argparse
+from datetime import datetime, timedelta
+from compliance import engine
+
+# Neutral support-call vocabulary; words that would trip a compliance rule are dropped below
+WORDS = """
+account address after again agent allow also amount another answer app area back balance bank bill
+billing call calling can card case change charge check code confirm connect connection contract cost
+could customer data date day details device did does done email error every file first following
+for from get give had has have help here home hour how internet invoice issue just know last later
+let light line look make many message minute modem month more name need network new next number
+office online only order other outage page password payment phone plan please port problem question
+rate receive record refund reset restart router said same screen see send service set setting should
+signal since speed start status still support sure system take team than that the then there this
+through ticket time today too transfer try update upgrade usage use user very wait want was way
+week what when where which while will wifi with without would yes yesterday you your
+""".split()
+
+CUSTOMER_OPENERS = ["My", "The", "Our", "Why is my", "Can you check my", "I think the"]
+
+DEFAULT_RULE_RATES = {
+    "greeting": 0.9,
+    "personalization": 0.5,
+    "apology": 0.4,
+    "resolution": 0.6,
+    # For a negated rule the rate is how often the forbidden phrase appears
+    "no_unsupported_claims": 0.1
+}
+
+class Distribution:
+    """Integer length distribution: "fixed:N", "uniform:LOW:HIGH", "normal:MEAN:SD" or
+    "lognormal:MEAN:SIGMA" (MEAN is the median), optionally clamped with ":MIN:MAX"."""
+
+    def __init__(self, spec):
+        parts = spec.split(":")
+        self.kind = parts[0]
+        values = [float(value) for value in parts[1:]]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected or len(values) not in (expected[self.kind], expected[self.kind] + 2):
+            raise ValueError(f"Invalid distribution '{spec}'")
+        self.params = values[:expected[self.kind]]
+        self.low, self.high = values[expected[self.kind]:] or (1, math.inf)
+        self.spec = spec
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        else:
+            value = rng.lognormvariate(math.log(self.params[0]), self.params[1])
+        return int(min(max(round(value), self.low), self.high))
+
+def _rule_patterns():
+    return [re.compile(rule.pattern()) for rule in engine.rules]
+
+def _phrase(keyword):
+    # "guarantee*" -> "guaranteed"
+    return keyword[:-1] + "d" if keyword.endswith("*") else keyword
+
+class CorpusGenerator:
+    """Reproducible synthetic call transcripts in the bulk ingestion format.
+
+    Conversation i depends only on (seed, i), so a corpus of any size streams in
+    constant memory and any slice of it can be regenerated independently. Each
+    compliance rule is hit in a conversation with its configured probability,
+    using the rule's own keywords, and never by accident.
+    """
+
+    def __init__(self, seed=0, turns="lognormal:8:0.4:2:60", words="lognormal:12:0.6:1:400",
+                 rule_rates=None, start=datetime(2024, 1, 1), days=90):
+        self.seed = seed
+        self.turns = Distribution(turns)
+        self.words = Distribution(words)
+        self.rule_rates = dict(DEFAULT_RULE_RATES if rule_rates is None else rule_rates)
+        rules = {rule.name: rule for rule in engine.rules}
+        unknown = set(self.rule_rates) - set(rules)
+        if unknown:
+            raise ValueError(f"Unknown compliance rules: {', '.join(sorted(unknown))}")
+        self.rules = [rules[name] for name in self.rule_rates]
+        patterns = _rule_patterns()
+        self.vocabulary = [word for word in WORDS if not any(pattern.search(word) for pattern in patterns)]
+        self.start = start
+        self.days = days
+
+    def _sentence(self, rng, length):
+        words = rng.choices(self.vocabulary, k=length)
+        return " ".join(words).capitalize() + rng.choice([".", "?", "!", "."])
+
+    def conversation(self, index):
+        rng = random.Random(f"{self.seed}:{index}")
+        created_at = self.start + timedelta(seconds=rng.uniform(0, self.days * 86400))
+        turns = max(self.turns.sample(rng), 1)
+        messages = []
+        for turn in range(turns):
+            sender = "agent" if turn % 2 == 0 else "customer"
+            text = self._sentence(rng, self.words.sample(rng))
+            if sender == "customer":
+                text = f"{rng.choice(CUSTOMER_OPENERS)} {text[0].lower()}{text[1:]}"
+            messages.append({"sender": sender, "text": text})
+
+        agent_turns = list(range(0, turns, 2))
+        for rule in self.rules:
+            if rng.random() >= self.rule_rates[rule.name]:
+                continue
+            target = 0 if rule.scope == "first_message" else rng.choice(agent_turns)
+            phrase, text = _phrase(rng.choice(rule.keywords)), messages[target]["text"]
+            messages[target]["text"] = f"{phrase[0].upper()}{phrase[1:]}, {text[0].lower()}{text[1:]}"
+
+        timestamp = created_at
+        for message in messages:
+            timestamp += timedelta(seconds=rng.uniform(5, 90))
+            message["timestamp"] = timestamp.isoformat()
+        return {
+            "external_id": f"bench-{self.seed}-{index}",
+            "created_at": created_at.isoformat(),
+            "messages": messages
+        }
+
+    def conversations(self, count, offset=0):
+        for index in range(offset, offset + count):
+            yield self.conversation(index)
+
+    def texts(self, count, offset=0):
+        """Message texts only, for classifier benchmarks."""
+        produced = 0
+        for conversation in self.conversations(count, offset):
+            for message in conversation["messages"]:
+                if produced == count:
+                    return
+                yield message["text"]
+                produced += 1
+
+def parse_rates(values):
+    rates = dict(DEFAULT_RULE_RATES)
+    for value in values or []:
+        name, rate = value.split("=", 1)
+        rates[name] = float(rate)
+    return rates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic conversations as NDJSON for ingest.py.")
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--offset", type=int, default=0, help="index of the first conversation, for sharding")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--turns", default="lognormal:8:0.4:2:60", help="messages per conversation distribution")
+    parser.add_argument("--words", default="lognormal:12:0.6:1:400", help="words per message distribution")
+    parser.add_argument("--rate", action="append", metavar="RULE=P", help="probability a conversation hits RULE")
+    parser.add_argument("--days", type=int, default=90, help="spread created_at over this many days from 2024-01-01")
+    parser.add_argument("--output", help="file to write; .gz is compressed (default: stdout)")
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(args.seed, args.turns, args.words, parse_rates(args.rate), days=args.days)
+    if args.output and args.output.endswith(".gz"):
+        output = gzip.open(args.output, "wt", encoding="utf-8")
+    else:
+        output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    messages = 0
+    with output:
+        for conversation in generator.conversations(args.conversations, args.offset):
+            messages += len(conversation["messages"])
+            output.write(json.dumps(conversation) + "\n")
+    print(f"Generated {args.conversations} conversations, {messages} messages", file=sys.stderr)
@@ -0,0 +1,106 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+from benchmarks.timing import summarize
+
+DEFAULT_TARGETS = [
+    "4*GET /api/conversations?limit=50",
+    "2*GET /api/analytics/compliance",
+    "2*GET /api/analytics/emotions",
+    "1*POST /api/analyze"
+]
+
+def parse_target(spec):
+    """"[WEIGHT*]METHOD PATH" -> (weight, method, path)."""
+    head, _, path = spec.partition(" ")
+    weight, _, method = head.rpartition("*")
+    return int(weight or 1), method.upper(), path
+
+def run_load(url, targets, concurrency=8, duration=30.0, texts=None, timeout=30.0, seed=0):
+    """Drive weighted requests at url from concurrency keep-alive connections for duration seconds.
+
+    POST targets send {"text": ...} bodies drawn from texts. Returns overall and
+    per-target throughput and p50/p95/p99 latency, with status counts.
+    """
+    parts = urlsplit(url)
+    targets = [parse_target(spec) for spec in targets]
+    weights = [weight for weight, _, _ in targets]
+    texts = texts or ["Thanks, it is working now."]
+    latencies = defaultdict(list)
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(f"{seed}:{index}")
+        connection = None
+        local = defaultdict(list)
+        local_statuses = Counter()
+        while time.perf_counter() < deadline:
+            _, method, path = rng.choices(targets, weights)[0]
+            body = json.dumps({"text": rng.choice(texts)}) if method == "POST" else None
+            headers = {"Content-Type": "application/json"} if body else {}
+            if connection is None:
+                connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = str(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                connection.close()
+                connection = None
+            local[f"{method} {path}"].append(time.perf_counter() - started)
+            local_statuses[status] += 1
+        with lock:
+            for key, values in local.items():
+                latencies[key].extend(values)
+            statuses.update(local_statuses)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration_seconds": duration,
+        "overall": summarize(everything, elapsed),
+        "targets": {key: summarize(values, elapsed) for key, values in sorted(latencies.items())},
+        "statuses": dict(statuses)
+    }
+
+if __name__ == "__main__":
+    from benchmarks.corpus import CorpusGenerator
+
+    parser = argparse.ArgumentParser(description="HTTP load driver reporting throughput and p50/p95/p99 latency.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--target", action="append", metavar="[WEIGHT*]METHOD PATH",
+                        help=f"request mix (default: {', '.join(DEFAULT_TARGETS)})")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    texts = list(CorpusGenerator(args.seed).texts(1000))
+    report = run_load(args.url, args.target or DEFAULT_TARGETS, args.concurrency, args.duration, texts, seed=args.seed)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    failed = sum(count for status, count in report["statuses"].items() if not status.startswith("2"))
+    print(f"{report['overall']['count']} requests, {failed} failed", file=sys.stderr)
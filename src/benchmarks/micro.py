@@ -0,0 +1,64 @@
+import time
+import logging
+from analysis import EmotionAnalyzer
+from backends import BACKENDS
+from compliance import check_compliance
+from benchmarks.timing import summarize, time_calls
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_PATHS = [
+    "/api/analytics/emotions",
+    "/api/analytics/emotions?bucket=week",
+    "/api/analytics/compliance",
+    "/api/conversations?limit=100"
+]
+
+def bench_analyzer(texts, backends=BACKENDS, batch_size=32):
+    """analyze_text one call per text vs analyze_batch in batch_size chunks, per backend.
+
+    Batching and the result cache are off so every call reaches the model.
+    """
+    results = {}
+    for backend in backends:
+        try:
+            analyzer = EmotionAnalyzer(batching=False, cache_size=0, cache_path=None,
+                                       backend=backend, pool_size=0).load()
+        except Exception as e:
+            logger.warning(f"Skipping {backend} backend: {str(e)}")
+            results[backend] = {"error": str(e)}
+            continue
+        analyzer.warmup()
+        single = time_calls(analyzer.analyze_text, [(text,) for text in texts])
+        chunks = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        batched = time_calls(lambda chunk: analyzer.analyze_batch(chunk, batch_size), [(chunk,) for chunk in chunks])
+        batched["texts_per_second"] = round(len(texts) / batched["elapsed_seconds"], 2)
+        results[backend] = {
+            "model_version": analyzer.model_version,
+            "single": single,
+            "batched": {"batch_size": batch_size, **batched}
+        }
+    return results
+
+def bench_compliance(conversations):
+    """check_compliance over whole conversations."""
+    result = time_calls(check_compliance, [(conversation["messages"],) for conversation in conversations])
+    messages = sum(len(conversation["messages"]) for conversation in conversations)
+    result["messages_per_second"] = round(messages / result["elapsed_seconds"], 2)
+    return result
+
+def bench_endpoints(app, paths=ANALYTICS_PATHS, iterations=50):
+    """Latency of read endpoints through the Flask test client (no network, real database)."""
+    client = app.test_client()
+    results = {}
+    for path in paths:
+        client.get(path)
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(iterations):
+            call_started = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - call_started)
+            errors += response.status_code != 200
+        results[path] = {**summarize(latencies, time.perf_counter() - started), "errors": errors}
+    return results
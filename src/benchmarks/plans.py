@@ -0,0 +1,165 @@
+import sys
+import json
+import argparse
+from sqlalchemy import text
+from benchmarks.corpus import CorpusGenerator
+
+# Tables large enough that a sequential scan on a hot path is a regression
+LARGE_TABLES = {'conversations', 'messages', 'analysis_results', 'message_emotions'}
+
+# Hot queries as the app issues them; :conversation_id, :message_id, :external_id and :day
+# are taken from the seeded data so the planner sees realistic selectivity
+HOT_QUERIES = {
+    'conversation_messages': """
+        SELECT id, sender, text, timestamp FROM messages
+        WHERE conversation_id = :conversation_id ORDER BY timestamp
+    """,
+    'conversation_analysis': """
+        SELECT * FROM analysis_results WHERE conversation_id = :conversation_id
+    """,
+    'conversations_page': """
+        SELECT c.id, c.created_at, c.message_count, c.last_message_at,
+               a.emotion_summary -> 'emotions', a.overall_compliance_score
+        FROM conversations c LEFT JOIN analysis_results a ON a.conversation_id = c.id
+        ORDER BY c.created_at DESC, c.id DESC LIMIT 101
+    """,
+    'conversations_day': """
+        SELECT c.id, c.created_at, c.message_count
+        FROM conversations c
+        WHERE c.created_at >= :day AND c.created_at < CAST(:day AS timestamp) + interval '1 day'
+        ORDER BY c.created_at DESC, c.id DESC LIMIT 101
+    """,
+    'conversation_by_external_id': """
+        SELECT id FROM conversations WHERE external_id = :external_id
+    """,
+    'stored_message_scores': """
+        SELECT e.message_id, e.probs, e.token_count
+        FROM messages m JOIN message_emotions e ON e.message_id = m.id AND e.model_version = 'bench'
+        WHERE m.conversation_id = :conversation_id
+    """,
+    'analysis_containing_message': """
+        SELECT conversation_id FROM analysis_results
+        WHERE emotion_summary @> CAST(:message_filter AS jsonb)
+    """
+}
+
+# The index each hot query should be served by (tests/test_query_plans.py checks them)
+EXPECTED_INDEXES = {
+    'conversation_messages': 'ix_messages_conversation_id_timestamp',
+    'conversation_analysis': 'uq_analysis_results_conversation_id',
+    'conversations_page': 'ix_conversations_created_at_id',
+    'conversations_day': 'ix_conversations_created_at_id',
+    'conversation_by_external_id': 'conversations_external_id_key',
+    'stored_message_scores': 'message_emotions_pkey',
+    'analysis_containing_message': 'ix_analysis_results_emotion_summary'
+}
+
+SEED_ANALYSES_SQL = """
+    INSERT INTO analysis_results (conversation_id, emotion_summary, compliance_summary,
+                                  overall_compliance_score, analyzed_at)
+    SELECT c.id,
+           jsonb_build_object(
+               'aggregation', 'mean',
+               'emotions', jsonb_build_array(jsonb_build_object('label', 'neutral', 'score', 0.5)),
+               'messages', (SELECT jsonb_agg(jsonb_build_object('message_id', m.id, 'emotions', '[]'::jsonb))
+                            FROM messages m WHERE m.conversation_id = c.id)),
+           '{}'::jsonb, (c.id * 37) % 101, now()
+    FROM conversations c
+    WHERE NOT EXISTS (SELECT 1 FROM analysis_results a WHERE a.conversation_id = c.id)
+"""
+
+SEED_SCORES_SQL = """
+    INSERT INTO message_emotions (message_id, model_version, probs, token_count, created_at)
+    SELECT m.id, 'bench', '\\x0000000000000000'::bytea, 1, now() FROM messages m
+    ON CONFLICT DO NOTHING
+"""
+
+def seed(conversations, batch_size=1000, seed=0):
+    """Ingest synthetic conversations until there are at least `conversations`, with analyses."""
+    import ingest
+    from models import db
+
+    present = db.session.execute(text("SELECT count(*) FROM conversations")).scalar()
+    if present < conversations:
+        generator = CorpusGenerator(seed)
+        # Offset by what is present so reruns add new external ids instead of conflicting
+        for _ in ingest.ingest(generator.conversations(conversations - present, offset=present), batch_size):
+            pass
+    db.session.execute(text(SEED_ANALYSES_SQL))
+    db.session.execute(text(SEED_SCORES_SQL))
+    db.session.commit()
+    # Fresh statistics, or the planner reasons about empty tables
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+def _parameters():
+    from models import db
+
+    row = db.session.execute(text("""
+        SELECT c.id, c.external_id, c.created_at::date AS day, min(m.id) AS message_id
+        FROM conversations c JOIN messages m ON m.conversation_id = c.id
+        WHERE c.id >= (SELECT (min(id) + max(id)) / 2 FROM conversations)
+        GROUP BY c.id ORDER BY c.id LIMIT 1
+    """)).one()
+    return {
+        'conversation_id': row.id,
+        'external_id': row.external_id,
+        'day': row.day.isoformat(),
+        'message_filter': json.dumps({'messages': [{'message_id': row.message_id}]})
+    }
+
+def _scans(plan):
+    """(node type, relation, index) of every scan node in an EXPLAIN (FORMAT JSON) plan tree."""
+    if 'Relation Name' in plan or 'Index Name' in plan:
+        yield plan['Node Type'], plan.get('Relation Name'), plan.get('Index Name')
+    for child in plan.get('Plans', []):
+        yield from _scans(child)
+
+def check_plans(queries=HOT_QUERIES, prefer_indexes=False):
+    """EXPLAIN every hot query; returns {name: [problems]} for the queries that have any.
+
+    A problem is a sequential scan of a large table, or the query's entry in
+    EXPECTED_INDEXES not being used. prefer_indexes turns sequential scans off
+    for the check, so a small database, where a scan is the cheaper plan, still
+    shows whether the indexes can serve every query.
+    """
+    from models import db
+
+    parameters = _parameters()
+    if prefer_indexes:
+        db.session.execute(text("SET LOCAL enable_seqscan = off"))
+    failures = {}
+    for name, sql in queries.items():
+        plan = db.session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = list(_scans(plan[0]['Plan']))
+        problems = [f"seq scan on {relation}" for node, relation, _ in scans
+                    if node == 'Seq Scan' and relation in LARGE_TABLES]
+        expected = EXPECTED_INDEXES.get(name)
+        if expected and expected not in {index for _, _, index in scans}:
+            problems.append(f"{expected} not used")
+        if problems:
+            failures[name] = problems
+    db.session.rollback()
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fail if a hot query plans a sequential scan on a large table or misses its index. "
+                    "Run against a scratch database: --seed adds synthetic data. "
+                    "tests/test_query_plans.py runs the same checks under pytest.")
+    parser.add_argument("--seed", type=int, default=0, metavar="CONVERSATIONS",
+                        help="first ingest synthetic conversations up to this many (e.g. 200000)")
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        if args.seed:
+            seed(args.seed)
+        failures = check_plans()
+    for name in HOT_QUERIES:
+        status = ", ".join(failures[name]) if name in failures else "ok"
+        print(f"{name:32} {status}")
+    sys.exit(1 if failures else 0)
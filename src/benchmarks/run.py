@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+import config
+from backends import BACKENDS
+from benchmarks.corpus import CorpusGenerator
+from benchmarks import micro
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(texts=512, conversations=2000, backends=BACKENDS, batch_size=32, endpoints=True,
+              endpoint_iterations=50, seed=0):
+    generator = CorpusGenerator(seed)
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model_path": config.MODEL_PATH,
+            "seed": seed,
+            "texts": texts,
+            "conversations": conversations
+        },
+        "analyzer": micro.bench_analyzer(list(generator.texts(texts)), backends, batch_size),
+        "compliance": micro.bench_compliance(list(generator.conversations(conversations)))
+    }
+    if endpoints:
+        from app import app
+        report["endpoints"] = micro.bench_endpoints(app, iterations=endpoint_iterations)
+    return report
+
+def compare(baseline, current, tolerance=0.1, path=""):
+    """Metrics that got worse by more than tolerance: higher latencies, lower throughputs."""
+    regressions = []
+    for key, value in current.items():
+        if key == "meta" or key not in baseline:
+            continue
+        old = baseline[key]
+        name = f"{path}.{key}" if path else key
+        if isinstance(value, dict) and isinstance(old, dict):
+            regressions.extend(compare(old, value, tolerance, name))
+        elif not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+            continue
+        elif key.endswith("_ms") and value > old * (1 + tolerance):
+            regressions.append({"metric": name, "baseline": old, "current": value, "change": round(value / old - 1, 4)})
+        elif key.endswith("_per_second") and value < old * (1 - tolerance):
+            regressions.append({"metric": name, "baseline": old, "current": value, "change": round(value / old - 1, 4)})
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the microbenchmarks and emit JSON results.")
+    parser.add_argument("--texts", type=int, default=512, help="texts per classifier benchmark")
+    parser.add_argument("--conversations", type=int, default=2000, help="conversations for check_compliance")
+    parser.add_argument("--backend", action="append", choices=BACKENDS, help="backends to measure (default: all)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--skip-endpoints", action="store_true", help="skip analytics endpoints (no database)")
+    parser.add_argument("--endpoint-iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here as well as to stdout")
+    parser.add_argument("--compare", help="baseline results JSON; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative slowdown when comparing")
+    args = parser.parse_args()
+
+    report = run_suite(args.texts, args.conversations, args.backend or BACKENDS, args.batch_size,
+                       not args.skip_endpoints, args.endpoint_iterations, args.seed)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["regressions"] = compare(json.load(f), report, args.tolerance)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    if report.get("regressions"):
+        for regression in report["regressions"]:
+            print(f"Regression: {regression['metric']} {regression['baseline']} -> {regression['current']}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,30 @@
+import time
+import numpy as np
+
+def summarize(latencies, elapsed=None):
+    """Latency percentiles (ms) and throughput for a list of per-call durations in seconds."""
+    latencies = np.asarray(latencies, dtype=np.float64)
+    elapsed = float(latencies.sum()) if elapsed is None else elapsed
+    if not len(latencies):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "count": int(len(latencies)),
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_per_second": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "mean_ms": round(float(latencies.mean()) * 1000, 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(latencies.max()) * 1000, 3)
+    }
+
+def time_calls(fn, args_list):
+    """Call fn(*args) for every entry of args_list; returns summarize() of the calls."""
+    latencies = []
+    started = time.perf_counter()
+    for args in args_list:
+        call_started = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
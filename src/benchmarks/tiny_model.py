@@ -0,0 +1,55 @@
+import os
+import sys
+import argparse
+from compliance import engine
+from benchmarks.corpus import WORDS
+
+# Same label set and order as j-hartmann/emotion-english-distilroberta-base
+LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+
+def build_tiny_model(path, hidden_size=32, layers=2, heads=2, seed=0):
+    """Write a random-weight BERT classifier and WordPiece tokenizer to path.
+
+    It loads through the same AutoTokenizer/AutoConfig/backends code as the real
+    model, so the whole pipeline can be benchmarked offline; its scores are
+    meaningless. Point VOICEUP_MODEL_PATH at the directory to use it.
+    """
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    os.makedirs(path, exist_ok=True)
+    words = {word.lower() for word in WORDS}
+    for rule in engine.rules:
+        for keyword in rule.keywords:
+            words.update(keyword.rstrip("*").lower().split())
+    letters = [chr(code) for code in range(ord("a"), ord("z") + 1)] + list("0123456789.,!?'")
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + letters + [f"##{letter}" for letter in letters] + sorted(words)
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab) + "\n")
+    BertTokenizerFast(vocab_file, do_lower_case=True, model_max_length=512).save_pretrained(path)
+
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=hidden_size,
+        num_hidden_layers=layers,
+        num_attention_heads=heads,
+        intermediate_size=hidden_size * 2,
+        max_position_embeddings=512,
+        num_labels=len(LABELS),
+        id2label=dict(enumerate(LABELS)),
+        label2id={label: i for i, label in enumerate(LABELS)}
+    )
+    torch.manual_seed(seed)
+    BertForSequenceClassification(config).save_pretrained(path)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a tiny random-weight emotion model for offline benchmarks.")
+    parser.add_argument("path", help="output directory, e.g. ../models/tiny-emotion-model")
+    parser.add_argument("--hidden-size", type=int, default=32)
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    build_tiny_model(args.path, args.hidden_size, args.layers, seed=args.seed)
+    print(f"Tiny model written to {args.path}; run with VOICEUP_MODEL_PATH={os.path.abspath(args.path)}", file=sys.stderr)
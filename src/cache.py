@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text):
+    """Canonical form used for cache keys: NFC, trimmed, whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def model_identity(model_path):
+    """Fingerprint of a model directory.
+
+    Hashes config.json plus the name, size and mtime of every file, so replacing
+    the weights in models/emotion-model yields a new identity (and a cold cache).
+    Derived exports under onnx/ are skipped; callers add the backend themselves.
+    """
+    digest = hashlib.sha256()
+    config_path = os.path.join(model_path, "config.json")
+    if os.path.exists(config_path):
+        with open(config_path, "rb") as f:
+            digest.update(f.read())
+    for root, dirs, files in os.walk(model_path):
+        dirs[:] = sorted(name for name in dirs if name != "onnx")
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            rel = os.path.relpath(os.path.join(root, name), model_path)
+            digest.update(f"{rel}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+    return digest.hexdigest()[:16]
+
+class _SQLiteTier:
+    """Persistent cache tier shared by every worker process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS emotion_cache ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        conn = self._connect()
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, result FROM emotion_cache WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            found.update((key, json.loads(result)) for key, result in rows)
+        return found
+
+    def put_many(self, items):
+        if not items:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO emotion_cache (key, result, created_at) VALUES (?, ?, ?)",
+            [(key, json.dumps(value), now) for key, value in items]
+        )
+        conn.commit()
+
+class EmotionCache:
+    """Content-addressed result cache: bounded in-memory LRU over an optional SQLite tier.
+
+    Keys are sha256(model identity + normalized text), so results never leak
+    across model versions.
+    """
+
+    def __init__(self, identity, max_entries=10000, sqlite_path=None):
+        self.identity = identity
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = _SQLiteTier(sqlite_path) if sqlite_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.identity}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _copy(value):
+        return [dict(item) for item in value]
+
+    def _remember(self, key, value):
+        # Caller holds self._lock
+        if self.max_entries == 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, texts):
+        """Return {text: result} for every text that is cached."""
+        keys = {text: self.key(text) for text in texts}
+        found = {}
+        missing = []
+        with self._lock:
+            for text, key in keys.items():
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    found[text] = self._copy(value)
+                    self.hits += 1
+                else:
+                    missing.append(text)
+        if missing and self._disk is not None:
+            try:
+                stored = self._disk.get_many([keys[text] for text in missing])
+            except sqlite3.Error as e:
+                logger.warning(f"Emotion cache disk read failed: {str(e)}")
+                stored = {}
+            with self._lock:
+                for text in missing:
+                    value = stored.get(keys[text])
+                    if value is not None:
+                        self._remember(keys[text], value)
+                        found[text] = self._copy(value)
+                        self.disk_hits += 1
+        with self._lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, text):
+        return self.get_many([text]).get(text)
+
+    def put_many(self, results):
+        """Store {text: result} pairs; empty results are never cached."""
+        items = [(self.key(text), self._copy(value)) for text, value in results.items() if value]
+        with self._lock:
+            for key, value in items:
+                self._remember(key, value)
+        if self._disk is not None:
+            try:
+                self._disk.put_many(items)
+            except sqlite3.Error as e:
+                logger.warning(f"Emotion cache disk write failed: {str(e)}")
+
+    def put(self, text, result):
+        self.put_many({text: result})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "model_identity": self.identity,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._disk.path if self._disk is not None else None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0
+            }
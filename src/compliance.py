@@ -0,0 +1,175 @@
+import re
+import json
+import logging
+import config
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ("any", "first_message")
+
+class ComplianceRule:
+    """One keyword rule.
+
+    A rule passes when a message from `sender` contains one of its keywords
+    (only the conversation's first message when scope is "first_message"), or
+    when none does if negate is set. Keywords match whole words; a trailing
+    "*" matches any word ending ("guarantee*" also matches "guaranteed").
+    """
+
+    def __init__(self, name, keywords, case_sensitive=False, scope="any", negate=False):
+        if not keywords:
+            raise ValueError(f"Compliance rule '{name}' has no keywords")
+        if scope not in SCOPES:
+            raise ValueError(f"Compliance rule '{name}' has unknown scope '{scope}'")
+        self.name = name
+        self.keywords = list(keywords)
+        self.case_sensitive = case_sensitive
+        self.scope = scope
+        self.negate = negate
+
+    def pattern(self):
+        alternatives = []
+        # Longest first, so a phrase wins over a keyword it starts with
+        for keyword in sorted(self.keywords, key=len, reverse=True):
+            if keyword.endswith("*"):
+                alternatives.append(re.escape(keyword[:-1]) + r"\w*")
+            else:
+                alternatives.append(re.escape(keyword))
+        body = "|".join(alternatives)
+        if not self.case_sensitive:
+            body = f"(?i:{body})"
+        return rf"(?<!\w)(?:{body})(?!\w)"
+
+class ComplianceEngine:
+    """Compliance rules compiled into a single regular expression.
+
+    Every rule becomes one named group of a combined pattern wrapped in a
+    lookahead, so one scan per message reports every rule that matches anywhere
+    in it, including keywords that overlap another rule's phrase.
+    """
+
+    def __init__(self, rules, sender="agent"):
+        self.rules = list(rules)
+        self.sender = sender
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Compliance rule names must be unique")
+        self._check_conflicts()
+        self._groups = {f"r{i}": rule for i, rule in enumerate(self.rules)}
+        self._first_message_rules = {rule.name for rule in self.rules if rule.scope == "first_message"}
+        combined = "|".join(f"(?P<r{i}>{rule.pattern()})" for i, rule in enumerate(self.rules))
+        self._matcher = re.compile(f"(?=(?:{combined}))")
+
+    def _check_conflicts(self):
+        # Two rules matching at the same position would hide one of them, which can
+        # only happen when a keyword of one rule starts the keyword of another.
+        seen = []
+        for rule in self.rules:
+            for keyword in rule.keywords:
+                stem, wildcard = keyword.rstrip("*").lower(), keyword.endswith("*")
+                for other_stem, other_wildcard, other_rule in seen:
+                    if other_rule is rule:
+                        continue
+                    (short, short_wildcard), (long, _) = sorted(
+                        [(stem, wildcard), (other_stem, other_wildcard)], key=lambda item: len(item[0]))
+                    if long == short or long.startswith(short + " ") or (short_wildcard and long.startswith(short)):
+                        raise ValueError(
+                            f"Keyword '{keyword}' of rule '{rule.name}' overlaps rule '{other_rule.name}'"
+                        )
+                seen.append((stem, wildcard, rule))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        rules = [
+            ComplianceRule(
+                item["name"],
+                item["keywords"],
+                case_sensitive=item.get("case_sensitive", False),
+                scope=item.get("scope", "any"),
+                negate=item.get("negate", False)
+            )
+            for item in data["rules"]
+        ]
+        logger.info(f"Loaded {len(rules)} compliance rules from {path}")
+        return cls(rules, sender=data.get("sender", "agent"))
+
+    @property
+    def rule_names(self):
+        return [rule.name for rule in self.rules]
+
+    def _matches(self, text):
+        return {self._groups[match.lastgroup].name for match in self._matcher.finditer(text)}
+
+    @staticmethod
+    def _fields(message):
+        if isinstance(message, dict):
+            return message["sender"], message["text"]
+        return message.sender, message.text
+
+    def evaluate(self, messages, previous=None, first_message=None, history=()):
+        """Return (rules, score) for messages, or fold them into a previous rule state.
+
+        The rules latch, so evaluating only new messages against the rules dict of
+        an earlier analysis matches a full pass. first_message is the conversation's
+        first message; without previous it is simply messages[0]. history holds the
+        messages previous already covers: rules previous has no entry for (added
+        since) are checked against them as well.
+        """
+        if previous is None:
+            first_message = messages[0] if messages else None
+            history = ()
+        missing = {rule.name for rule in self.rules if rule.name not in previous} if history else set()
+        # (messages, rules to look for there); None means every rule
+        scans = [(history, missing)] if missing else []
+        scans.append((messages, None))
+        matched = set()
+        for scanned, only in scans:
+            for message in scanned:
+                sender, text = self._fields(message)
+                if sender != self.sender or not text:
+                    continue
+                hits = self._matches(text)
+                if message is not first_message:
+                    hits = {name for name in hits if name not in self._first_message_rules}
+                if only is not None:
+                    hits &= only
+                matched |= hits
+
+        rules = {}
+        for rule in self.rules:
+            seen = rule.name in matched
+            if previous is not None and rule.name in previous:
+                # A negated rule that failed before has already seen its keyword
+                seen = seen or (not previous[rule.name] if rule.negate else previous[rule.name])
+            rules[rule.name] = not seen if rule.negate else seen
+
+        score = sum(1 for passed in rules.values() if passed) / len(rules) * 100
+        return rules, round(score)
+
+    def evaluate_many(self, conversations):
+        """Score many conversations (each a list of messages) with the compiled matcher."""
+        return [self.evaluate(messages) for messages in conversations]
+
+engine = ComplianceEngine.from_file(config.COMPLIANCE_RULES_PATH)
+
+def check_compliance(messages, previous=None, first_message=None, history=()):
+    return engine.evaluate(messages, previous, first_message, history)
+
+def unseen_messages(messages, previous_summary):
+    """Messages a previous analysis did not cover, going by the message ids its emotion_summary records.
+
+    Returns None when that cannot be told (no per-message record, or the first
+    message is missing from it); the rules then have to be evaluated in full.
+    Stored message scores say nothing here: a message can be scored on its own
+    without ever being folded into the conversation's rule state.
+    """
+    recorded = previous_summary.get('messages') if isinstance(previous_summary, dict) else None
+    if not recorded or not messages:
+        return None
+    seen = {item.get('message_id') for item in recorded if isinstance(item, dict)}
+    ids = [message['id'] if isinstance(message, dict) else message.id for message in messages]
+    if ids[0] not in seen:
+        return None
+    return [message for message, message_id in zip(messages, ids) if message_id not in seen]
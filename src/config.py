@@ -0,0 +1,171 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# Model directory; benchmarks/tiny_model.py writes a random-weight stand-in for offline runs
+MODEL_PATH = os.getenv("VOICEUP_MODEL_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "emotion-model"
+)
+
+# Inference backend: torch, onnx-fp32 or onnx-int8 (see download_model.py --export-onnx)
+ANALYZER_BACKEND = os.getenv("VOICEUP_BACKEND", "torch")
+
+# When the model loads: "lazy" (first use, or the first readiness probe), "background" (thread at import) or
+# "preload" (blocking at import, e.g. in the gunicorn master before fork)
+MODEL_LOADING = os.getenv("VOICEUP_MODEL_LOADING", "lazy")
+# Throwaway forward passes run after loading; 0 disables warmup
+ANALYZER_WARMUP_ITERATIONS = _env_int("VOICEUP_WARMUP_ITERATIONS", 1)
+# torch/onnxruntime intra-op threads for in-process inference; 0 keeps the library default
+INFERENCE_THREADS = _env_int("VOICEUP_INFERENCE_THREADS", 0)
+
+# Out-of-process inference: number of worker processes (0 runs inference inline)
+INFERENCE_POOL_SIZE = _env_int("VOICEUP_INFERENCE_POOL_SIZE", 0)
+INFERENCE_POOL_THREADS = _env_int("VOICEUP_INFERENCE_POOL_THREADS", 1)
+# In-flight requests allowed before the API answers 503
+INFERENCE_POOL_MAX_PENDING = _env_int("VOICEUP_INFERENCE_POOL_MAX_PENDING", 64)
+INFERENCE_POOL_TIMEOUT = _env_float("VOICEUP_INFERENCE_POOL_TIMEOUT", 30.0)
+# A dead worker is respawned after a doubling delay (capped at the max); after
+# MAX_RESTARTS failures in a row without becoming ready it is left failed
+INFERENCE_POOL_RESTART_BACKOFF = _env_float("VOICEUP_INFERENCE_POOL_RESTART_BACKOFF", 5.0)
+INFERENCE_POOL_RESTART_BACKOFF_MAX = _env_float("VOICEUP_INFERENCE_POOL_RESTART_BACKOFF_MAX", 300.0)
+INFERENCE_POOL_MAX_RESTARTS = _env_int("VOICEUP_INFERENCE_POOL_MAX_RESTARTS", 5)
+
+# Micro-batching of concurrent classifier calls
+ANALYZER_BATCHING = _env_bool("VOICEUP_BATCHING", True)
+ANALYZER_MAX_BATCH_SIZE = _env_int("VOICEUP_MAX_BATCH_SIZE", 32)
+ANALYZER_MAX_WAIT_MS = _env_float("VOICEUP_MAX_WAIT_MS", 10.0)
+# Upper bound on padded tokens (batch rows x longest row) per forward pass
+ANALYZER_MAX_BATCH_TOKENS = _env_int("VOICEUP_MAX_BATCH_TOKENS", 16384)
+
+# Bulk analysis (/api/analyze/batch)
+ANALYZE_BATCH_MAX_ITEMS = _env_int("VOICEUP_ANALYZE_BATCH_MAX_ITEMS", 10000)
+ANALYZE_BATCH_WINDOW = _env_int("VOICEUP_ANALYZE_BATCH_WINDOW", 256)
+
+# Emotion result cache; set VOICEUP_CACHE_PATH to share a SQLite tier across workers
+EMOTION_CACHE_SIZE = _env_int("VOICEUP_CACHE_SIZE", 10000)
+EMOTION_CACHE_PATH = os.getenv("VOICEUP_CACHE_PATH") or None
+
+# Conversation analysis: "per_message" (length-bucketed, no truncation) or legacy "concatenated"
+CONVERSATION_ANALYSIS_MODE = os.getenv("VOICEUP_CONVERSATION_MODE", "per_message")
+# How per-message scores roll up: mean, max or length_weighted
+CONVERSATION_AGGREGATION = os.getenv("VOICEUP_CONVERSATION_AGGREGATION", "mean")
+
+# Compliance rule definitions (keywords, scopes, negation) compiled by compliance.py
+COMPLIANCE_RULES_PATH = os.getenv(
+    "VOICEUP_COMPLIANCE_RULES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "compliance_rules.json")
+)
+
+# GET /api/conversations page size
+CONVERSATIONS_PAGE_SIZE = _env_int("VOICEUP_CONVERSATIONS_PAGE_SIZE", 100)
+CONVERSATIONS_MAX_PAGE_SIZE = _env_int("VOICEUP_CONVERSATIONS_MAX_PAGE_SIZE", 1000)
+
+# Rows buffered per server-side cursor by the NDJSON export (export.py)
+EXPORT_FETCH_SIZE = _env_int("VOICEUP_EXPORT_FETCH_SIZE", 1000)
+
+# Bulk ingestion (/api/conversations/bulk, ingest.py): conversations per transaction
+INGEST_BATCH_SIZE = _env_int("VOICEUP_INGEST_BATCH_SIZE", 500)
+INGEST_MAX_ITEMS = _env_int("VOICEUP_INGEST_MAX_ITEMS", 10000)
+
+# Bulk re-analysis jobs (jobs.py): conversations per inference pass and commit
+JOB_CHUNK_SIZE = _env_int("VOICEUP_JOB_CHUNK_SIZE", 200)
+# Run queued jobs on a thread of each serving process; disable to use "python jobs.py work" instead
+JOB_RUNNER = _env_bool("VOICEUP_JOB_RUNNER", True)
+JOB_POLL_INTERVAL = _env_float("VOICEUP_JOB_POLL_INTERVAL", 2.0)
+# A running job without a heartbeat for this long is resumed by another runner
+JOB_STALE_SECONDS = _env_int("VOICEUP_JOB_STALE_SECONDS", 300)
+
+def _env_pairs(name, cast=str):
+    """Parse "key=value,key=value" into a dict."""
+    pairs = {}
+    for item in (os.getenv(name) or "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            pairs[key.strip()] = cast(value.strip())
+    return pairs
+
+def _env_timeouts(name):
+    """Parse "endpoint=seconds,endpoint=seconds" into a dict."""
+    return _env_pairs(name, float)
+
+# ASGI serving mode (asgi.py): worker threads per route class, i.e. requests in flight.
+# Together they should fit in the database connection pool.
+ASGI_BIND = os.getenv("VOICEUP_BIND", "127.0.0.1:5000")
+ASGI_INFERENCE_CONCURRENCY = _env_int("VOICEUP_ASGI_INFERENCE_CONCURRENCY", 4)
+ASGI_READ_CONCURRENCY = _env_int("VOICEUP_ASGI_READ_CONCURRENCY", 10)
+# Open event streams (live_events); they hold a thread each but no database connection
+ASGI_STREAM_CONCURRENCY = _env_int("VOICEUP_ASGI_STREAM_CONCURRENCY", 100)
+# Seconds a request may wait for a slot before 503, and for its response before 504
+ASGI_QUEUE_TIMEOUT = _env_float("VOICEUP_ASGI_QUEUE_TIMEOUT", 5.0)
+ASGI_INFERENCE_TIMEOUT = _env_float("VOICEUP_ASGI_INFERENCE_TIMEOUT", 60.0)
+ASGI_READ_TIMEOUT = _env_float("VOICEUP_ASGI_READ_TIMEOUT", 15.0)
+ASGI_STREAM_TIMEOUT = _env_float("VOICEUP_ASGI_STREAM_TIMEOUT", 15.0)
+# Per-endpoint overrides, e.g. "analyze_conversation=120,get_message=2"
+ASGI_ROUTE_TIMEOUTS = _env_timeouts("VOICEUP_ASGI_ROUTE_TIMEOUTS")
+
+# Per-request timing breakdown (Server-Timing header) for requests sending "X-Profile: 1"
+PROFILING_ENABLED = _env_bool("VOICEUP_PROFILING", True)
+
+# Live call analysis (live.py): turns from all live calls share micro-batches of this size/wait
+LIVE_MAX_BATCH_SIZE = _env_int("VOICEUP_LIVE_MAX_BATCH_SIZE", 64)
+LIVE_MAX_WAIT_MS = _env_float("VOICEUP_LIVE_MAX_WAIT_MS", 5.0)
+# Seconds between batched writes of new turns, and of inactivity before a call is dropped
+LIVE_FLUSH_INTERVAL = _env_float("VOICEUP_LIVE_FLUSH_INTERVAL", 1.0)
+LIVE_IDLE_TIMEOUT = _env_int("VOICEUP_LIVE_IDLE_TIMEOUT", 1800)
+# Updates buffered per event-stream subscriber before it starts losing them
+LIVE_SUBSCRIBER_QUEUE = _env_int("VOICEUP_LIVE_SUBSCRIBER_QUEUE", 1000)
+
+# Database (database.py). Reads of GET /api/conversations*, /api/analytics/* and /api/export/*
+# go to the replica when one is set; everything else uses the primary.
+DATABASE_URL = os.getenv("VOICEUP_DATABASE_URL", "postgresql://postgres@localhost:5432/voiceup_db")
+DATABASE_REPLICA_URL = os.getenv("VOICEUP_DATABASE_REPLICA_URL") or None
+# Connections per process and engine: size the pool for gunicorn threads or the ASGI lanes
+DB_POOL_SIZE = _env_int("VOICEUP_DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("VOICEUP_DB_MAX_OVERFLOW", 5)
+DB_POOL_TIMEOUT = _env_float("VOICEUP_DB_POOL_TIMEOUT", 10.0)
+# Seconds before a connection is replaced, below any proxy or server idle cutoff
+DB_POOL_RECYCLE = _env_int("VOICEUP_DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = _env_bool("VOICEUP_DB_POOL_PRE_PING", True)
+# Statement timeout (ms) for request transactions, 0 to disable; background jobs are not limited
+DB_STATEMENT_TIMEOUT_MS = _env_int("VOICEUP_DB_STATEMENT_TIMEOUT_MS", 30000)
+# Per-endpoint overrides in ms, e.g. "export_conversations=0,get_emotion_analytics=5000"
+DB_ROUTE_STATEMENT_TIMEOUTS = _env_timeouts("VOICEUP_DB_ROUTE_STATEMENT_TIMEOUTS")
+
+# Logging (logs.py): "json" lines or "text", written by a background thread
+LOG_FORMAT = os.getenv("VOICEUP_LOG_FORMAT", "json")
+LOG_LEVEL = os.getenv("VOICEUP_LOG_LEVEL", "INFO").upper()
+# Per-module levels, e.g. "analysis=DEBUG,sqlalchemy.engine=INFO"
+LOG_LEVELS = _env_pairs("VOICEUP_LOG_LEVELS")
+# Fraction of bulky debug payloads (classifier outputs) that are logged, overall and per module
+LOG_SAMPLE_RATE = _env_float("VOICEUP_LOG_SAMPLE_RATE", 0.01)
+LOG_SAMPLE_RATES = _env_pairs("VOICEUP_LOG_SAMPLE_RATES", float)
+# Customer text in log records is replaced by its length unless this is off; then it is truncated
+LOG_REDACT_TEXT = _env_bool("VOICEUP_LOG_REDACT_TEXT", True)
+LOG_TEXT_MAX_CHARS = _env_int("VOICEUP_LOG_TEXT_MAX_CHARS", 80)
+# Records waiting for the writer thread; further records are dropped, never waited on
+LOG_QUEUE_SIZE = _env_int("VOICEUP_LOG_QUEUE_SIZE", 10000)
+# JSON file with {"levels": {...}, "sample_rates": {...}} re-read when it changes, for runtime changes
+LOG_CONFIG_PATH = os.getenv("VOICEUP_LOG_CONFIG") or None
+LOG_CONFIG_POLL_SECONDS = _env_float("VOICEUP_LOG_CONFIG_POLL_SECONDS", 5.0)
+
+# HTTP response cache (response_cache.py) for dashboard read endpoints, per process
+RESPONSE_CACHE = _env_bool("VOICEUP_RESPONSE_CACHE", True)
+RESPONSE_CACHE_MAX_BYTES = _env_int("VOICEUP_RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+
+# Stored per-message probability vectors (emotion_store.py): float16 halves the bytes of float32
+EMOTION_STORE_DTYPE = os.getenv("VOICEUP_EMOTION_STORE_DTYPE", "float16")
@@ -0,0 +1,54 @@
+import contextvars
+import logging
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+import config
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+
+# Set per request by the app: whether reads may go to the replica, and the statement timeout (ms)
+use_replica = contextvars.ContextVar("voiceup_use_replica", default=False)
+statement_timeout = contextvars.ContextVar("voiceup_statement_timeout", default=None)
+
+class RoutingSession(SignallingSession):
+    """Session that sends a request's reads to the replica when the request allows it.
+
+    Anything the session is flushing, and every statement outside replica-routed
+    requests (writes, background jobs, CLI scripts), goes to the primary. Without
+    a configured replica everything goes to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if use_replica.get() and not self._flushing and REPLICA_BIND in (self.app.config.get('SQLALCHEMY_BINDS') or {}):
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause, **kwargs)
+
+@event.listens_for(RoutingSession, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    timeout = statement_timeout.get()
+    if timeout:
+        # SET LOCAL ends with the transaction, so pooled connections come back unchanged
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+def configure(app):
+    """Database settings of app from config.py (VOICEUP_DATABASE_* / VOICEUP_DB_* variables)."""
+    app.config['SQLALCHEMY_DATABASE_URI'] = config.DATABASE_URL
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if config.DATABASE_REPLICA_URL:
+        app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: config.DATABASE_REPLICA_URL}
+    # Applies to the primary and the replica engine alike
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': config.DB_POOL_SIZE,
+        'max_overflow': config.DB_MAX_OVERFLOW,
+        'pool_timeout': config.DB_POOL_TIMEOUT,
+        'pool_recycle': config.DB_POOL_RECYCLE,
+        'pool_pre_ping': config.DB_POOL_PRE_PING
+    }
+    logger.info(f"Database pool size {config.DB_POOL_SIZE} (+{config.DB_MAX_OVERFLOW} overflow), "
+                f"read replica {'enabled' if config.DATABASE_REPLICA_URL else 'disabled'}")
@@ -1,5 +1,8 @@
 import os
+import argparse
+import config
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from backends import ONNX_DIR, ONNX_FILES
 
 def download_model():
     print("Downloading emotion classification model...")
@@ -8,8 +11,7 @@ def download_model():
     model_id = "j-hartmann/emotion-english-distilroberta-base"
     
     # Set up local path
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    local_model_path = os.path.join(os.path.dirname(current_dir), "models", "emotion-model")
+    local_model_path = get_model_path()
     
     # Create directory if it doesn't exist
     os.makedirs(local_model_path, exist_ok=True)
@@ -28,5 +30,73 @@ def download_model():
         print(f"Error downloading model: {e}")
         raise
 
+def get_model_path():
+    return config.MODEL_PATH
+
+def export_onnx():
+    """Export the local model to ONNX and write a dynamically quantized int8 copy."""
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    local_model_path = get_model_path()
+    onnx_dir = os.path.join(local_model_path, ONNX_DIR)
+    os.makedirs(onnx_dir, exist_ok=True)
+    fp32_path = os.path.join(onnx_dir, ONNX_FILES["onnx-fp32"])
+    int8_path = os.path.join(onnx_dir, ONNX_FILES["onnx-int8"])
+
+    try:
+        print("Exporting emotion model to ONNX...")
+        tokenizer = AutoTokenizer.from_pretrained(local_model_path)
+        model = AutoModelForSequenceClassification.from_pretrained(local_model_path)
+        model.config.return_dict = False
+        model.eval()
+
+        sample = tokenizer(["Hello, how can I assist you today?"], return_tensors="pt")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"]),
+                fp32_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"}
+                },
+                opset_version=13,
+                do_constant_folding=True
+            )
+        print(f"ONNX model written to {fp32_path}")
+
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"int8 quantized model written to {int8_path}")
+        for path in (fp32_path, int8_path):
+            print(f"  {os.path.basename(path)}: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+    except Exception as e:
+        print(f"Error exporting model: {e}")
+        raise
+
+def report_parity():
+    """Print the score deviation of each ONNX backend against torch."""
+    from analysis import parity_report
+
+    for backend in ONNX_FILES:
+        report = parity_report(backend)
+        print(f"{backend}: max abs deviation {report['max_abs_deviation']}, "
+              f"mean abs deviation {report['mean_abs_deviation']}, "
+              f"top-1 agreement {report['top1_agreement'] * 100:.1f}% over {report['samples']} samples")
+
 if __name__ == "__main__":
-    download_model()
+    parser = argparse.ArgumentParser(description="Download and optionally export the emotion model.")
+    parser.add_argument("--export-onnx", action="store_true", help="export ONNX fp32 and int8 graphs after downloading")
+    parser.add_argument("--skip-download", action="store_true", help="reuse the model already in models/emotion-model")
+    parser.add_argument("--parity", action="store_true", help="report ONNX score deviation against the torch backend")
+    args = parser.parse_args()
+
+    if not args.skip_download:
+        download_model()
+    if args.export_onnx:
+        export_onnx()
+    if args.parity:
+        report_parity()
@@ -0,0 +1,105 @@
+import logging
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
+import config
+from database import RoutingSession
+from models import db, EmotionLabelSet
+
+logger = logging.getLogger(__name__)
+
+DTYPES = {"float16": np.float16, "float32": np.float32}
+
+# Model versions whose label order is known to be committed, per process
+_registered = set()
+
+def encode(vector):
+    """A probability vector (in the model's label order) as compact bytes."""
+    return np.asarray(vector, dtype=DTYPES[config.EMOTION_STORE_DTYPE]).tobytes()
+
+def register_labels(model_version, labels):
+    """Record the label order of model_version's vectors, once, in the current transaction."""
+    pending = db.session.info.setdefault('label_versions', set())
+    if model_version in _registered or model_version in pending:
+        return
+    db.session.execute(
+        insert(EmotionLabelSet.__table__)
+        .values(model_version=model_version, labels=list(labels))
+        .on_conflict_do_nothing(index_elements=['model_version'])
+    )
+    # Only trusted once the transaction commits; a rollback drops the row again
+    pending.add(model_version)
+
+def _commit_labels(session):
+    _registered.update(session.info.pop('label_versions', ()))
+
+def _discard_labels(session):
+    session.info.pop('label_versions', None)
+
+event.listen(RoutingSession, 'after_commit', _commit_labels)
+event.listen(RoutingSession, 'after_rollback', _discard_labels)
+
+def labels_for(model_version):
+    row = EmotionLabelSet.query.get(model_version)
+    return list(row.labels) if row is not None else None
+
+def decode_many(rows, labels):
+    """Stack stored vectors into a float32 [n, labels] matrix.
+
+    rows are (probs bytes, legacy scores) pairs, None for a message without a
+    stored result. The dtype follows from the byte length, so float16 and
+    float32 rows can be mixed; each dtype is decoded with one frombuffer call.
+    Rows from before vectors were stored are rebuilt from their JSON scores.
+    """
+    matrix = np.zeros((len(rows), len(labels)), dtype=np.float32)
+    if not labels:
+        # Nothing to place the values under (no label set and no JSON scores)
+        return matrix
+    groups = {}
+    index = None
+    for i, row in enumerate(rows):
+        if row is None:
+            continue
+        probs, scores = row
+        if probs is not None:
+            groups.setdefault(len(probs) // len(labels), []).append(i)
+        elif scores:
+            if index is None:
+                index = {label: j for j, label in enumerate(labels)}
+            for item in scores:
+                if item['label'] in index:
+                    matrix[i, index[item['label']]] = item['score']
+    for itemsize, positions in groups.items():
+        dtype = np.dtype(f"f{itemsize}")
+        data = b"".join(bytes(rows[i][0]) for i in positions)
+        matrix[positions] = np.frombuffer(data, dtype=dtype).reshape(len(positions), len(labels))
+    return matrix
+
+def running(probs, lengths, aggregation):
+    """The conversation-level aggregate after each turn, as EmotionAnalyzer.aggregate would give it."""
+    mask = (lengths > 0)[:, None]
+    if aggregation == "max":
+        return np.maximum.accumulate(np.where(mask, probs, 0), axis=0)
+    if aggregation == "length_weighted":
+        weights = lengths.astype(np.float64)[:, None]
+        totals = np.cumsum(probs * weights, axis=0)
+        counts = np.cumsum(weights, axis=0)
+    else:
+        totals = np.cumsum(np.where(mask, probs, 0), axis=0)
+        counts = np.cumsum(mask, axis=0)
+    return np.divide(totals, counts, out=np.zeros_like(totals, dtype=np.float64), where=counts > 0)
+
+def rolling(probs, lengths, window):
+    """Mean over the last `window` scored turns at each turn (unscored turns are skipped)."""
+    mask = lengths > 0
+    scored = np.cumsum(np.where(mask[:, None], probs, 0), axis=0, dtype=np.float64)
+    counts = np.cumsum(mask)
+    # Position in `scored` of the turn where each window starts
+    order = np.flatnonzero(mask)
+    result = np.zeros_like(scored)
+    for_turn = counts - window
+    has_start = for_turn > 0
+    starts = np.where(has_start, order[np.clip(for_turn - 1, 0, None)] if len(order) else 0, -1)
+    previous = np.where(has_start[:, None], scored[np.clip(starts, 0, None)], 0)
+    np.divide(scored - previous, np.minimum(counts, window)[:, None], out=result, where=(counts > 0)[:, None])
+    return result
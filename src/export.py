@@ -0,0 +1,140 @@
+import sys
+import json
+import zlib
+import argparse
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from models import db
+
+logger = logging.getLogger(__name__)
+
+CONVERSATIONS_SQL = """
+    SELECT c.id, c.external_id, c.created_at, a.emotion_summary, a.compliance_summary, a.overall_compliance_score
+    FROM conversations c
+    LEFT JOIN analysis_results a ON a.conversation_id = c.id
+    WHERE {where}
+    ORDER BY c.id
+"""
+
+MESSAGES_SQL = """
+    SELECT m.id, m.conversation_id, m.sender, m.text, m.timestamp
+    FROM messages m
+    JOIN conversations c ON c.id = m.conversation_id
+    WHERE {where}
+    ORDER BY m.conversation_id, m.timestamp, m.id
+"""
+
+def _filters(since=None, until=None, after_id=None):
+    clauses = ["TRUE"]
+    params = {}
+    if since is not None:
+        clauses.append("c.created_at >= :since")
+        params['since'] = since
+    if until is not None:
+        clauses.append("c.created_at < :until")
+        params['until'] = until
+    if after_id is not None:
+        clauses.append("c.id > :after_id")
+        params['after_id'] = after_id
+    return " AND ".join(clauses), params
+
+def iter_conversations(since=None, until=None, after_id=None, fetch_size=1000):
+    """Yield export records (conversation, messages, analysis) in id order.
+
+    Conversations and messages are read through two server-side cursors over the
+    same filter, both sorted by conversation id, and merged as they stream, so at
+    most `fetch_size` rows of each are held in memory. `until` is exclusive and
+    `after_id` resumes after the last id a previous export wrote.
+    """
+    where, params = _filters(since, until, after_id)
+    connection = db.session.connection().execution_options(stream_results=True, max_row_buffer=fetch_size)
+    conversations = connection.execute(text(CONVERSATIONS_SQL.format(where=where)), params)
+    messages = connection.execute(text(MESSAGES_SQL.format(where=where)), params)
+    pending = next(messages, None)
+    try:
+        for row in conversations:
+            record_messages = []
+            # Messages of conversations excluded by the filter are never selected
+            while pending is not None and pending.conversation_id == row.id:
+                record_messages.append({
+                    'id': pending.id,
+                    'sender': pending.sender,
+                    'text': pending.text,
+                    'timestamp': pending.timestamp.isoformat()
+                })
+                pending = next(messages, None)
+            analyzed = row.overall_compliance_score is not None
+            yield {
+                'id': row.id,
+                'external_id': row.external_id,
+                'created_at': row.created_at.isoformat(),
+                'messages': record_messages,
+                'analysis': {
+                    'emotion_summary': row.emotion_summary if analyzed else None,
+                    'compliance_summary': row.compliance_summary if analyzed else None,
+                    'overall_compliance_score': row.overall_compliance_score
+                }
+            }
+    finally:
+        conversations.close()
+        messages.close()
+
+def iter_ndjson(records, compress=False, chunk_size=64 * 1024):
+    """Encode records as NDJSON byte chunks, optionally gzip-compressed on the fly.
+
+    Every chunk ends on a record boundary and, when compressed, with a sync flush,
+    so whatever a reader has received so far decodes to whole records.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+    for record in records:
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            chunk = b"".join(buffer)
+            buffer, size = [], 0
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else chunk
+    chunk = b"".join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+if __name__ == "__main__":
+    import config
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Stream conversations, messages and analyses as NDJSON.")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only conversations created at or after this ISO time")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="only conversations created before this ISO time")
+    parser.add_argument("--after-id", type=int, help="resume after this conversation id")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    parser.add_argument("--fetch-size", type=int, default=config.EXPORT_FETCH_SIZE, help="rows buffered per cursor")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    progress = {'last_id': args.after_id, 'count': 0}
+    written = dict(progress)
+
+    def tracked(records):
+        for record in records:
+            progress['last_id'] = record['id']
+            progress['count'] += 1
+            yield record
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        with app.app_context():
+            records = iter_conversations(args.since, args.until, args.after_id, args.fetch_size)
+            for chunk in iter_ndjson(tracked(records), compress=args.gzip):
+                output.write(chunk)
+                # Chunks end on record boundaries, so everything tracked so far is on disk
+                written.update(progress)
+    finally:
+        if args.output:
+            output.close()
+        # Printed even on failure so an interrupted export can resume with --after-id
+        print(f"Exported {written['count']} conversations, last id {written['last_id']}", file=sys.stderr)
@@ -0,0 +1,26 @@
+import gc
+import os
+import multiprocessing
+
+# Load the model once in the master; forked workers share its pages copy-on-write.
+os.environ.setdefault("VOICEUP_MODEL_LOADING", "preload")
+preload_app = os.environ["VOICEUP_MODEL_LOADING"] == "preload"
+
+bind = os.getenv("VOICEUP_BIND", "127.0.0.1:5000")
+workers = int(os.getenv("VOICEUP_WORKERS", max(2, multiprocessing.cpu_count() // 2)))
+threads = int(os.getenv("VOICEUP_THREADS", 8))
+worker_class = "gthread"
+timeout = int(os.getenv("VOICEUP_WORKER_TIMEOUT", 120))
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach, so GC passes in
+    # the workers do not write to (and thereby copy) the shared model pages.
+    gc.freeze()
+
+def post_fork(server, worker):
+    from analysis import analyzer
+    # Warm up per worker: running inference in the master before fork can leave
+    # the children with a broken intra-op thread pool.
+    if analyzer.ready:
+        analyzer.warmup()
+        server.log.info(f"Worker {worker.pid} warmed up model {analyzer.model_version}")
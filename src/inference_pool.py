@@ -0,0 +1,338 @@
+import os
+import time
+import atexit
+import itertools
+import threading
+import logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class InferencePoolBusy(Exception):
+    """Every result slot is taken; callers should answer 503 rather than queue."""
+
+class InferenceWorkerError(RuntimeError):
+    """A request failed inside, timed out in, or lost its inference worker."""
+
+def _worker_main(worker_id, requests, responses, shm_name, shape, threads, backend):
+    # The worker must not start a pool of its own or preload at import time
+    os.environ["VOICEUP_INFERENCE_POOL_SIZE"] = "0"
+    os.environ["VOICEUP_MODEL_LOADING"] = "lazy"
+    from analysis import EmotionAnalyzer
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    table = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    try:
+        analyzer = EmotionAnalyzer(batching=False, cache_size=0, cache_path=None, backend=backend,
+                                   num_threads=threads, pool_size=0).load()
+        analyzer.warmup()
+    except Exception as e:
+        responses.send(("failed", None, str(e)))
+        shm.close()
+        return
+    responses.send(("ready", None, os.getpid()))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        request_id, slot, kind, payload = message
+        if kind == "ping":
+            responses.send(("pong", request_id, None))
+            continue
+        try:
+            if kind == "texts":
+                probs = analyzer.predict_proba(payload)
+            else:
+                probs = analyzer.classify_sequences(payload)
+            # Results go back through shared memory; the pipe only carries the request id
+            table[slot, :len(probs)] = probs
+            responses.send(("done", request_id, None))
+        except Exception as e:
+            responses.send(("error", request_id, str(e)))
+    shm.close()
+
+class _Worker:
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.process = None
+        self.queue = None
+        self.responses = None
+        self.pid = None
+        self.ready = False
+        self.restarts = 0
+        # Deaths since the worker was last ready; past the pool's limit it stays failed
+        self.failures = 0
+        self.failed = False
+        self.retry_at = None
+        self.last_seen = time.monotonic()
+        self.inflight = set()
+
+class _Request:
+    __slots__ = ("slot", "rows", "worker", "done", "error", "abandoned")
+
+    def __init__(self, slot, rows, worker):
+        self.slot = slot
+        self.rows = rows
+        self.worker = worker
+        self.done = threading.Event()
+        self.error = None
+        self.abandoned = False
+
+class InferencePool:
+    """Pool of inference processes, each with its own model and pinned thread count.
+
+    Texts (or token id sequences) travel to a worker over its own multiprocessing
+    queue; probabilities come back through a shared-memory table with one slot per
+    in-flight request, and only a small status tuple over the worker's pipe, so a
+    crashing worker can only break its own channels. The number of slots bounds
+    the backlog: when none is free the call raises InferencePoolBusy instead of
+    queuing without limit. A monitor thread pings workers, fails the requests of
+    crashed or hung workers and restarts them after an exponential backoff; a
+    worker that dies max_restarts times in a row without becoming ready is marked
+    failed and the pool stops reporting ready.
+    """
+
+    def __init__(self, size, num_labels, threads=1, max_pending=64, max_rows=32,
+                 timeout=30.0, health_interval=5.0, backend="torch", restart_backoff=5.0,
+                 max_restart_backoff=300.0, max_restarts=5):
+        self.size = max(1, int(size))
+        self.num_labels = num_labels
+        self.threads = threads
+        self.max_pending = max(1, int(max_pending))
+        self.max_rows = max(1, int(max_rows))
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.backend = backend
+        self.restart_backoff = restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+        self.max_restarts = max(0, int(max_restarts))
+        self._lock = threading.Lock()
+        self._pid = None
+        self._ids = itertools.count(1)
+
+    def _ensure_started(self):
+        # Like the micro-batcher, a forked process needs its own pool
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._start()
+
+    def _start(self):
+        self._ctx = mp.get_context("spawn")
+        self._shape = (self.max_pending, self.max_rows, self.num_labels)
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self._shape)) * 4)
+        self._table = np.ndarray(self._shape, dtype=np.float32, buffer=self._shm.buf)
+        self._free_slots = list(range(self.max_pending))
+        self._pending = {}
+        self._workers = [_Worker(i) for i in range(self.size)]
+        for worker in self._workers:
+            self._spawn(worker)
+        self._pid = os.getpid()
+        threading.Thread(target=self._collect, name="inference-pool-collector", daemon=True).start()
+        threading.Thread(target=self._monitor, name="inference-pool-monitor", daemon=True).start()
+        atexit.register(self.shutdown)
+        logger.info(f"Started inference pool with {self.size} workers x {self.threads} threads, {self.max_pending} slots")
+
+    def _spawn(self, worker):
+        if worker.responses is not None:
+            worker.responses.close()
+        worker.queue = self._ctx.Queue()
+        worker.responses, writer = self._ctx.Pipe(duplex=False)
+        worker.ready = False
+        worker.last_seen = time.monotonic()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.worker_id, worker.queue, writer, self._shm.name, self._shape, self.threads, self.backend),
+            name=f"inference-worker-{worker.worker_id}",
+            daemon=True
+        )
+        worker.process.start()
+        writer.close()
+        worker.pid = worker.process.pid
+
+    def _acquire_slot(self):
+        with self._lock:
+            if not self._free_slots:
+                raise InferencePoolBusy(f"All {self.max_pending} inference slots are busy")
+            return self._free_slots.pop()
+
+    def _release(self, request_id):
+        # Caller holds self._lock
+        request = self._pending.pop(request_id, None)
+        if request is not None:
+            request.worker.inflight.discard(request_id)
+            self._free_slots.append(request.slot)
+
+    def _submit(self, kind, payload):
+        slot = self._acquire_slot()
+        request_id = next(self._ids)
+        with self._lock:
+            usable = [worker for worker in self._workers if not worker.failed]
+            if not usable:
+                self._free_slots.append(slot)
+                raise InferenceWorkerError("Every inference worker has failed")
+            alive = [worker for worker in usable if worker.process.is_alive()] or usable
+            worker = min(alive, key=lambda w: (not w.ready, len(w.inflight)))
+            request = _Request(slot, len(payload), worker)
+            self._pending[request_id] = request
+            worker.inflight.add(request_id)
+        worker.queue.put((request_id, slot, kind, payload))
+
+        finished = request.done.wait(self.timeout)
+        with self._lock:
+            if not finished:
+                # The worker may still write into the slot, so it is freed when it answers
+                request.abandoned = True
+                raise InferenceWorkerError(f"Inference timed out after {self.timeout}s")
+            try:
+                if request.error is not None:
+                    raise InferenceWorkerError(request.error)
+                return self._table[slot, :request.rows].copy()
+            finally:
+                self._release(request_id)
+
+    def _run(self, kind, items):
+        self._ensure_started()
+        if not items:
+            return np.zeros((0, self.num_labels), dtype=np.float32)
+        chunks = [items[start:start + self.max_rows] for start in range(0, len(items), self.max_rows)]
+        return np.concatenate([self._submit(kind, chunk) for chunk in chunks])
+
+    def predict_proba(self, texts):
+        return self._run("texts", list(texts))
+
+    def classify_sequences(self, sequences):
+        return self._run("sequences", list(sequences))
+
+    def _collect(self):
+        while True:
+            with self._lock:
+                channels = {worker.responses: worker for worker in self._workers if not worker.responses.closed}
+            for channel in wait(list(channels), timeout=0.5):
+                worker = channels[channel]
+                try:
+                    status, request_id, detail = channel.recv()
+                except (EOFError, OSError):
+                    # The worker died; stop polling its pipe until the monitor respawns it
+                    with self._lock:
+                        if worker.responses is channel:
+                            channel.close()
+                    continue
+                self._handle(worker, status, request_id, detail)
+
+    def _handle(self, worker, status, request_id, detail):
+        with self._lock:
+            worker.last_seen = time.monotonic()
+            if status == "ready":
+                worker.ready = True
+                worker.failures = 0
+                logger.info(f"Inference worker {worker.worker_id} ready (pid {detail})")
+            elif status == "failed":
+                logger.error(f"Inference worker {worker.worker_id} failed to load the model: {detail}")
+            elif status in ("done", "error"):
+                request = self._pending.get(request_id)
+                if request is None:
+                    return
+                request.error = detail if status == "error" else None
+                if request.abandoned:
+                    self._release(request_id)
+                else:
+                    request.done.set()
+
+    def _monitor(self):
+        while True:
+            time.sleep(self.health_interval)
+            self._check_workers()
+
+    def _check_workers(self):
+        with self._lock:
+            now = time.monotonic()
+            for worker in self._workers:
+                if worker.failed:
+                    continue
+                if worker.retry_at is not None:
+                    if now >= worker.retry_at:
+                        worker.retry_at = None
+                        worker.restarts += 1
+                        self._spawn(worker)
+                    continue
+                hung = worker.inflight and now - worker.last_seen > self.timeout + self.health_interval
+                if worker.process.is_alive() and not hung:
+                    if worker.ready:
+                        worker.queue.put((0, None, "ping", None))
+                    continue
+                if hung:
+                    logger.error(f"Inference worker {worker.worker_id} (pid {worker.pid}) is unresponsive")
+                    worker.process.kill()
+                else:
+                    logger.error(f"Inference worker {worker.worker_id} (pid {worker.pid}) exited with {worker.process.exitcode}")
+                worker.ready = False
+                for request_id in list(worker.inflight):
+                    request = self._pending.get(request_id)
+                    if request is None:
+                        continue
+                    request.error = f"Inference worker {worker.worker_id} crashed"
+                    if request.abandoned:
+                        self._release(request_id)
+                    else:
+                        request.done.set()
+                worker.inflight.clear()
+                worker.failures += 1
+                if worker.failures > self.max_restarts:
+                    worker.failed = True
+                    logger.error(f"Inference worker {worker.worker_id} died {worker.failures} times in a row, giving up")
+                    continue
+                delay = min(self.restart_backoff * 2 ** (worker.failures - 1), self.max_restart_backoff)
+                worker.retry_at = now + delay
+                logger.warning(f"Restarting inference worker {worker.worker_id} in {delay:.1f}s")
+
+    def health(self):
+        if self._pid != os.getpid():
+            return {"started": False, "size": self.size}
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "started": True,
+                "size": self.size,
+                "threads_per_worker": self.threads,
+                "slots": self.max_pending,
+                "free_slots": len(self._free_slots),
+                "workers": [{
+                    "id": worker.worker_id,
+                    "pid": worker.pid,
+                    "alive": worker.process.is_alive(),
+                    "ready": worker.ready,
+                    "inflight": len(worker.inflight),
+                    "restarts": worker.restarts,
+                    "failed": worker.failed,
+                    "last_seen_seconds": round(now - worker.last_seen, 3)
+                } for worker in self._workers]
+            }
+
+    @property
+    def ready(self):
+        # A worker that gave up restarting needs an operator, so the pool stays unready
+        return (self._pid == os.getpid() and not any(worker.failed for worker in self._workers)
+                and any(worker.ready for worker in self._workers))
+
+    def shutdown(self):
+        if self._pid != os.getpid():
+            return
+        for worker in self._workers:
+            try:
+                worker.queue.put(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+        self._shm.close()
+        self._shm.unlink()
+        self._pid = None
@@ -0,0 +1,145 @@
+import io
+import csv
+import sys
+import json
+import argparse
+import logging
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from models import db, Conversation
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_COLUMNS = ("conversation_id", "sender", "text", "timestamp")
+
+def parse_conversation(item):
+    """Validate one ingest item; returns (external_id, created_at, messages) or raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("Item must be an object")
+    external_id = item.get('external_id')
+    if not isinstance(external_id, str) or not external_id or len(external_id) > 255:
+        raise ValueError("Missing or invalid 'external_id'")
+    created_at = datetime.fromisoformat(item['created_at']) if item.get('created_at') else datetime.utcnow()
+    messages = item.get('messages')
+    if not isinstance(messages, list):
+        raise ValueError("'messages' must be a list")
+    rows = []
+    for i, msg in enumerate(messages):
+        if not isinstance(msg, dict) or not isinstance(msg.get('sender'), str) or not isinstance(msg.get('text'), str):
+            raise ValueError("Each message needs string 'sender' and 'text'")
+        # Missing timestamps keep the input order, which is the order messages are read back in
+        timestamp = datetime.fromisoformat(msg['timestamp']) if msg.get('timestamp') else created_at + timedelta(milliseconds=i)
+        rows.append((msg['sender'][:50], msg['text'], timestamp))
+    return external_id, created_at, rows
+
+def _copy_messages(rows):
+    """Load (conversation_id, sender, text, timestamp) rows with COPY on the session's connection."""
+    buffer = io.StringIO()
+    # Quote everything so empty strings are not read back as NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for conversation_id, sender, text, timestamp in rows:
+        writer.writerow((conversation_id, sender, text, timestamp.isoformat()))
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY messages ({', '.join(MESSAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+def ingest_batch(items):
+    """Insert one batch of conversations and their messages in a single transaction.
+
+    Conversations go in with one multi-row INSERT ... ON CONFLICT (external_id) DO
+    NOTHING RETURNING, messages with COPY, and only for conversations this call
+    created, so retrying a batch never duplicates rows. No analysis runs here;
+    new conversations have no analysis result until they are analyzed.
+    Returns one result dict per item, in input order.
+    """
+    results = [None] * len(items)
+    parsed = {}
+    for index, item in enumerate(items):
+        try:
+            external_id, created_at, messages = parse_conversation(item)
+        except (ValueError, TypeError) as e:
+            results[index] = {'index': index, 'error': str(e)}
+            continue
+        if external_id in parsed:
+            results[index] = {'index': index, 'external_id': external_id, 'error': "Duplicate 'external_id' in batch"}
+            continue
+        parsed[external_id] = (index, created_at, messages)
+    if not parsed:
+        return results
+
+    table = Conversation.__table__
+    inserted = db.session.execute(
+        insert(table)
+        .values([{
+            'external_id': key,
+            'created_at': created_at,
+            'message_count': len(messages),
+            'last_message_at': max((timestamp for _, _, timestamp in messages), default=None)
+        } for key, (_, created_at, messages) in parsed.items()])
+        .on_conflict_do_nothing(index_elements=['external_id'])
+        .returning(table.c.id, table.c.external_id)
+    ).fetchall()
+    created = {row.external_id: row.id for row in inserted}
+    existing = dict(db.session.execute(
+        select(table.c.external_id, table.c.id).where(table.c.external_id.in_([key for key in parsed if key not in created]))
+    ).fetchall()) if len(created) < len(parsed) else {}
+
+    message_rows = []
+    for key, (index, _, messages) in parsed.items():
+        if key in created:
+            message_rows.extend((created[key], sender, text, timestamp) for sender, text, timestamp in messages)
+            results[index] = {'index': index, 'external_id': key, 'id': created[key],
+                              'status': 'created', 'message_count': len(messages)}
+        else:
+            results[index] = {'index': index, 'external_id': key, 'id': existing.get(key), 'status': 'existing'}
+    if message_rows:
+        _copy_messages(message_rows)
+    db.session.commit()
+    logger.info(f"Ingested {len(created)} conversations ({len(message_rows)} messages), {len(parsed) - len(created)} already present")
+    return results
+
+def read_ndjson(lines):
+    """Parse NDJSON lines; invalid lines become items that fail validation."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield None
+
+def ingest(items, batch_size=500):
+    """Ingest an iterable of conversations in transactions of batch_size; yields results in order."""
+    items = iter(items)
+    offset = 0
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        for result in ingest_batch(batch):
+            result['index'] += offset
+            yield result
+        offset += len(batch)
+
+if __name__ == "__main__":
+    import config
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Bulk-load conversations and messages from NDJSON.")
+    parser.add_argument("input", nargs="?", help="NDJSON file, one conversation per line (default: stdin)")
+    parser.add_argument("--batch-size", type=int, default=config.INGEST_BATCH_SIZE, help="conversations per transaction")
+    args = parser.parse_args()
+
+    source = open(args.input, encoding="utf-8") if args.input else sys.stdin
+    counts = {'created': 0, 'existing': 0, 'error': 0}
+    with app.app_context():
+        for result in ingest(read_ndjson(source), args.batch_size):
+            counts[result.get('status', 'error')] += 1
+            print(json.dumps(result))
+    print(f"Created {counts['created']}, already present {counts['existing']}, failed {counts['error']}", file=sys.stderr)
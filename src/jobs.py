@@ -0,0 +1,284 @@
+import os
+import sys
+import time
+import json
+import socket
+import argparse
+import threading
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
+from models import db, Conversation, AnalysisResult, AnalysisJob
+from analysis import AGGREGATIONS
+from scoring import summarize_many
+from compliance import check_compliance
+import rollups
+import config
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+
+class JobOwnershipLost(Exception):
+    """The job was cancelled or reclaimed by another runner while a chunk was in flight."""
+
+def create_job(since=None, until=None, unanalyzed=False, full=False, aggregation=None, chunk_size=None):
+    """Queue a re-analysis of every conversation created in [since, until).
+
+    unanalyzed restricts it to conversations without an analysis result (e.g.
+    after bulk ingestion); full rescores messages already stored for the
+    current model version.
+    """
+    aggregation = aggregation or config.CONVERSATION_AGGREGATION
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"aggregation must be one of {', '.join(AGGREGATIONS)}")
+    chunk_size = int(chunk_size or config.JOB_CHUNK_SIZE)
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    job = AnalysisJob(status='queued', params={
+        'since': since.isoformat() if since else None,
+        'until': until.isoformat() if until else None,
+        'unanalyzed': bool(unanalyzed),
+        'full': bool(full),
+        'aggregation': aggregation,
+        'chunk_size': chunk_size
+    })
+    db.session.add(job)
+    db.session.commit()
+    logger.info(f"Queued analysis job {job.id} with {job.params}")
+    return job
+
+def describe(job):
+    """API view of a job, with throughput and ETA measured over its current run."""
+    rate = eta = None
+    if job.run_started_at and job.heartbeat_at:
+        elapsed = (job.heartbeat_at - job.run_started_at).total_seconds()
+        done = job.processed + job.failed - job.run_processed
+        if elapsed > 0 and done > 0:
+            rate = done / elapsed
+            if job.status == 'running' and job.total is not None:
+                eta = max(job.total - job.processed - job.failed, 0) / rate
+    finished = job.processed + job.failed
+    return {
+        'id': job.id,
+        'status': job.status,
+        'params': job.params,
+        'total': job.total,
+        'processed': job.processed,
+        'failed': job.failed,
+        'progress': round(finished / job.total * 100, 2) if job.total else None,
+        'throughput_per_second': round(rate, 2) if rate else None,
+        'eta_seconds': round(eta, 1) if eta is not None else None,
+        'last_conversation_id': job.last_conversation_id,
+        'worker': job.worker,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'heartbeat_at': job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+def _conversations(params):
+    query = Conversation.query
+    if params.get('since'):
+        query = query.filter(Conversation.created_at >= datetime.fromisoformat(params['since']))
+    if params.get('until'):
+        query = query.filter(Conversation.created_at < datetime.fromisoformat(params['until']))
+    if params.get('unanalyzed'):
+        query = query.filter(~Conversation.analysis_result.has())
+    return query
+
+def process_chunk(job_id, worker):
+    """Re-analyze the next chunk of a job and commit it together with the checkpoint.
+
+    Messages of every conversation in the chunk are scored in one pass, so short
+    conversations share inference batches. Results, rollup deltas (one locked
+    update per day) and the new checkpoint go out in a single transaction, so a
+    crash never loses or double-counts a chunk. Returns the number of
+    conversations handled, 0 when the job is finished.
+    """
+    job = AnalysisJob.query.get(job_id)
+    params = job.params
+    conversations = (_conversations(params)
+                     .filter(Conversation.id > job.last_conversation_id)
+                     .options(selectinload(Conversation.messages), selectinload(Conversation.analysis_result))
+                     .order_by(Conversation.id)
+                     .limit(params['chunk_size'])
+                     .all())
+    if not conversations:
+        return 0
+
+    # Same rule as the analyze endpoint: conversations without text are skipped
+    analyzable = [conv for conv in conversations if any(msg.text.strip() for msg in conv.messages)]
+    summaries = summarize_many([conv.messages for conv in analyzable], params['aggregation'], full=params['full'])
+    old, new = defaultdict(list), defaultdict(list)
+    for conv, (emotion_summary, _) in zip(analyzable, summaries):
+        # Rules may have changed since the last run, so compliance is always re-evaluated in full
+        compliance_rules, compliance_score = check_compliance(conv.messages)
+        day = conv.created_at.date()
+        analysis = conv.analysis_result
+        if analysis:
+            old[day].append(rollups.snapshot(analysis))
+            analysis.emotion_summary = emotion_summary
+            analysis.compliance_summary = compliance_rules
+            analysis.overall_compliance_score = compliance_score
+            analysis.analyzed_at = datetime.utcnow()
+        else:
+            analysis = AnalysisResult(
+                conversation_id=conv.id,
+                emotion_summary=emotion_summary,
+                compliance_summary=compliance_rules,
+                overall_compliance_score=compliance_score
+            )
+            db.session.add(analysis)
+        new[day].append(rollups.snapshot(analysis))
+
+    # Re-read the job under a row lock: a cancel or a reclaim since the chunk began wins
+    job = AnalysisJob.query.filter_by(id=job_id).populate_existing().with_for_update().one()
+    if job.status != 'running' or job.worker != worker:
+        db.session.rollback()
+        raise JobOwnershipLost(f"Job {job_id} is {job.status} on {job.worker}")
+    # Days in a fixed order so concurrent writers lock rollup rows consistently
+    for day in sorted(set(old) | set(new)):
+        rollups.apply(day, rollups.combine(old[day]), rollups.combine(new[day]))
+    job.processed += len(analyzable)
+    job.failed += len(conversations) - len(analyzable)
+    job.last_conversation_id = conversations[-1].id
+    job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+    db.session.expunge_all()
+    return len(conversations)
+
+class JobRunner:
+    """Executes queued analysis jobs on a background thread of this process.
+
+    Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so every process
+    can run a runner without two of them taking the same job. A running job
+    whose heartbeat is older than stale_seconds belongs to a crashed runner and
+    is claimed again, resuming after its last committed chunk.
+    """
+
+    def __init__(self, poll_interval=2.0, stale_seconds=300):
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def worker_id(self):
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self, app):
+        # Like the micro-batcher, a forked process needs its own thread
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self.run_forever, args=(app,), name="analysis-job-runner", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+        logger.info(f"Started analysis job runner {self.worker_id}")
+
+    def run_forever(self, app):
+        with app.app_context():
+            while True:
+                try:
+                    job_id = self.claim()
+                    if job_id is None:
+                        time.sleep(self.poll_interval)
+                    else:
+                        self.execute(job_id)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Analysis job runner error: {str(e)}")
+                    time.sleep(self.poll_interval)
+
+    def claim(self):
+        """Take the oldest queued (or abandoned) job; returns its id or None."""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.stale_seconds)
+        job = (AnalysisJob.query
+               .filter(or_(AnalysisJob.status == 'queued',
+                           and_(AnalysisJob.status == 'running', AnalysisJob.heartbeat_at < stale)))
+               .order_by(AnalysisJob.id)
+               .with_for_update(skip_locked=True)
+               .first())
+        if job is None:
+            db.session.rollback()
+            return None
+        if job.status == 'running':
+            logger.warning(f"Resuming analysis job {job.id} abandoned by {job.worker} after conversation {job.last_conversation_id}")
+        remaining = _conversations(job.params).filter(Conversation.id > job.last_conversation_id).count()
+        job.status = 'running'
+        job.worker = self.worker_id
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.run_started_at = now
+        job.run_processed = job.processed + job.failed
+        job.total = job.processed + job.failed + remaining
+        job.error = None
+        db.session.commit()
+        return job.id
+
+    def execute(self, job_id):
+        worker = self.worker_id
+        logger.info(f"Running analysis job {job_id}")
+        while True:
+            try:
+                if not process_chunk(job_id, worker):
+                    break
+            except JobOwnershipLost as e:
+                logger.info(f"Stopped analysis job {job_id}: {str(e)}")
+                return
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Analysis job {job_id} failed: {str(e)}")
+                self._finish(job_id, worker, 'failed', str(e))
+                return
+        self._finish(job_id, worker, 'completed')
+
+    def _finish(self, job_id, worker, status, error=None):
+        job = AnalysisJob.query.filter_by(id=job_id).populate_existing().with_for_update().one()
+        if job.status == 'running' and job.worker == worker:
+            job.status = status
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            logger.info(f"Analysis job {job_id} {status}: {job.processed} analyzed, {job.failed} skipped")
+        db.session.commit()
+
+runner = JobRunner(config.JOB_POLL_INTERVAL, config.JOB_STALE_SECONDS)
+
+if __name__ == "__main__":
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Queue, run and inspect bulk re-analysis jobs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit", help="queue a re-analysis job")
+    submit.add_argument("--since", type=datetime.fromisoformat, help="conversations created at or after this ISO time")
+    submit.add_argument("--until", type=datetime.fromisoformat, help="conversations created before this ISO time")
+    submit.add_argument("--unanalyzed", action="store_true", help="only conversations without an analysis result")
+    submit.add_argument("--full", action="store_true", help="rescore messages already scored by the current model")
+    submit.add_argument("--aggregation", choices=AGGREGATIONS, help="how message scores roll up")
+    submit.add_argument("--chunk-size", type=int, help="conversations per inference pass and commit")
+    commands.add_parser("work", help="run queued jobs in this process until interrupted")
+    status = commands.add_parser("status", help="show one job, or the most recent ones")
+    status.add_argument("job_id", type=int, nargs="?")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == "submit":
+            job = create_job(args.since, args.until, args.unanalyzed, args.full, args.aggregation, args.chunk_size)
+            print(json.dumps(describe(job), indent=2))
+        elif args.command == "work":
+            runner.run_forever(app)
+        elif args.job_id is not None:
+            job = AnalysisJob.query.get(args.job_id)
+            if job is None:
+                print(f"Job {args.job_id} not found", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps(describe(job), indent=2))
+        else:
+            jobs = AnalysisJob.query.order_by(AnalysisJob.id.desc()).limit(20).all()
+            print(json.dumps([describe(job) for job in jobs], indent=2))
@@ -0,0 +1,387 @@
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+import logging
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+from sqlalchemy import func
+import config
+import rollups
+import emotion_store
+from models import db, Conversation, Message, AnalysisResult, MessageEmotion
+from analysis import AGGREGATIONS, analyzer
+from batching import MicroBatcher
+from compliance import check_compliance
+
+logger = logging.getLogger(__name__)
+
+class CallNotLive(KeyError):
+    """No live call with this id in this process."""
+
+class LiveCall:
+    """Running state of one call: rolling emotion aggregate, latched compliance
+    rules and the turns not yet written to the database."""
+
+    def __init__(self, conversation_id, created_at, aggregation, num_labels):
+        self.conversation_id = conversation_id
+        self.created_at = created_at
+        self.aggregation = aggregation
+        self.lock = threading.Lock()
+        self.turns = 0
+        self.first_message = None
+        self.rules = None
+        self.score = None
+        self.scored = 0
+        self.prob_sum = np.zeros(num_labels, dtype=np.float64)
+        self.prob_max = np.zeros(num_labels, dtype=np.float64)
+        self.weighted_sum = np.zeros(num_labels, dtype=np.float64)
+        self.tokens = 0
+        self.pending = []
+        self.stored_messages = []
+        self.stored_snapshot = None
+        self.updated_at = time.monotonic()
+
+    def add(self, message, probs, length):
+        # Caller holds self.lock; the sums are order-independent and the rules latch,
+        # so turns scored concurrently can be applied in any order
+        if length:
+            self.scored += 1
+            self.prob_sum += probs
+            np.maximum(self.prob_max, probs, out=self.prob_max)
+            self.weighted_sum += probs * length
+            self.tokens += int(length)
+        # An empty previous state still keeps first_message, whichever turn is applied first
+        self.rules, self.score = check_compliance([message], self.rules or {}, self.first_message)
+        self.pending.append((message, probs, int(length)))
+        self.updated_at = time.monotonic()
+
+    def summary(self):
+        """Same result as EmotionAnalyzer.aggregate over every scored turn, without revisiting them."""
+        if not self.scored:
+            return np.zeros_like(self.prob_sum)
+        if self.aggregation == "max":
+            return self.prob_max
+        if self.aggregation == "length_weighted":
+            return self.weighted_sum / self.tokens
+        return self.prob_sum / self.scored
+
+class LiveCalls:
+    """In-memory analysis of calls in progress.
+
+    Each new turn is classified on its own through a dedicated micro-batcher, so
+    turns arriving from every live call share forward passes, and is folded into
+    its call's state in O(1). Updates go back to the caller and to SSE
+    subscribers. A background thread writes new turns (Message and
+    MessageEmotion rows) and the call's AnalysisResult to the database in
+    batched transactions, off the per-turn path.
+
+    State lives in the process that started the call: route a call's requests
+    to one process (a single worker, the ASGI mode, or sticky routing on the
+    conversation id).
+    """
+
+    def __init__(self, max_batch_size=64, max_wait_ms=5.0, flush_interval=1.0,
+                 idle_timeout=1800, subscriber_queue=1000):
+        self.batcher = MicroBatcher(self._score, max_batch_size, max_wait_ms)
+        self.flush_interval = flush_interval
+        self.idle_timeout = idle_timeout
+        self.subscriber_queue = subscriber_queue
+        self._calls = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher_pid = None
+        self._app = None
+        self.flushes = 0
+        self.flushed_turns = 0
+        self.flush_errors = 0
+        self.dropped_events = 0
+
+    @staticmethod
+    def _score(texts):
+        probs, lengths = analyzer.message_scores(texts)
+        return list(zip(probs, lengths))
+
+    def _ensure_flusher(self, app):
+        # Threads do not survive fork, so a forked worker starts its own
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._app = app
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name="live-call-flusher", daemon=True).start()
+            atexit.register(self._flush_at_exit)
+
+    def start(self, app, external_id=None, aggregation=None):
+        """Create the call's conversation and begin tracking it; returns the LiveCall."""
+        aggregation = aggregation or config.CONVERSATION_AGGREGATION
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"aggregation must be one of {', '.join(AGGREGATIONS)}")
+        self._ensure_flusher(app)
+        conversation = Conversation(external_id=external_id)
+        db.session.add(conversation)
+        db.session.commit()
+        call = LiveCall(conversation.id, conversation.created_at, aggregation, len(analyzer.labels))
+        with self._lock:
+            self._calls[call.conversation_id] = call
+        self._publish(call, self._update(call, "start"))
+        logger.info(f"Live call {call.conversation_id} started")
+        return call
+
+    def get(self, conversation_id):
+        call = self._calls.get(conversation_id)
+        if call is None:
+            raise CallNotLive(conversation_id)
+        return call
+
+    def add_turn(self, conversation_id, sender, text, timestamp=None):
+        """Classify one new turn and fold it into the call; returns the update pushed to subscribers."""
+        started = time.perf_counter()
+        call = self.get(conversation_id)
+        message = {"sender": sender[:50], "text": text, "timestamp": timestamp or datetime.utcnow()}
+        with call.lock:
+            # The first turn to arrive is the call's first message for scoped rules
+            turn = call.turns
+            call.turns += 1
+            if call.first_message is None:
+                call.first_message = message
+        if text.strip():
+            probs, length = self.batcher.submit(text)
+        else:
+            probs, length = np.zeros(len(call.prob_sum), dtype=np.float32), 0
+        with call.lock:
+            call.add(message, probs, length)
+            update = self._update(call, "turn")
+        update.update({
+            "turn": turn,
+            "sender": message["sender"],
+            "emotions": analyzer.to_emotions(probs) if length else [],
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3)
+        })
+        self._publish(call, update)
+        return update
+
+    def end(self, conversation_id):
+        """Stop tracking the call after writing everything it still holds.
+
+        Raises when that write fails; the call then stays live, so the flusher
+        or a retried end still writes its turns.
+        """
+        call = self.get(conversation_id)
+        while True:
+            self.flush([call], raise_errors=True)
+            # A turn may have arrived during the write; only drop the call once nothing is left
+            with self._lock, call.lock:
+                if not call.pending:
+                    self._calls.pop(conversation_id, None)
+                    break
+        with call.lock:
+            update = self._update(call, "end")
+        self._publish(call, update)
+        logger.info(f"Live call {conversation_id} ended after {call.turns} turns")
+        return update
+
+    def _update(self, call, kind):
+        # Caller holds call.lock (or the call is not shared yet)
+        return {
+            "type": kind,
+            "conversation_id": call.conversation_id,
+            "turns": call.turns,
+            "summary": analyzer.to_emotions(call.summary()),
+            "aggregation": call.aggregation,
+            "compliance_summary": call.rules,
+            "overall_compliance_score": call.score
+        }
+
+    def subscribe(self, conversation_ids=None):
+        """Queue receiving updates of the given calls (all calls when None)."""
+        subscriber = (queue.Queue(maxsize=self.subscriber_queue), set(conversation_ids) if conversation_ids else None)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _publish(self, call, update):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events, conversation_ids in subscribers:
+            if conversation_ids is not None and call.conversation_id not in conversation_ids:
+                continue
+            try:
+                events.put_nowait(update)
+            except queue.Full:
+                # A stalled subscriber loses events rather than slowing the calls down
+                self.dropped_events += 1
+
+    def events(self, subscriber, heartbeat=15.0):
+        """Server-sent event stream for a subscriber; unsubscribes when the client leaves."""
+        events, _ = subscriber
+        try:
+            while True:
+                try:
+                    update = events.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {update['type']}\ndata: {json.dumps(update)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def flush(self, calls=None, raise_errors=False):
+        """Write pending turns and refreshed analysis results of calls in one transaction.
+
+        On failure the turns go back to their calls for the next attempt, and the
+        error is raised when raise_errors is set (otherwise 0 is returned).
+        """
+        with self._flush_lock:
+            if calls is None:
+                with self._lock:
+                    calls = list(self._calls.values())
+            batch = []
+            for call in calls:
+                with call.lock:
+                    if not call.pending:
+                        continue
+                    batch.append((call, call.pending, call.summary().copy(), dict(call.rules), call.score))
+                    call.pending = []
+            if not batch:
+                return 0
+            try:
+                written = self._write(batch)
+            except Exception as e:
+                db.session.rollback()
+                self.flush_errors += 1
+                logger.error(f"Live call flush failed, will retry: {str(e)}")
+                for call, turns, _, _, _ in batch:
+                    with call.lock:
+                        call.pending = turns + call.pending
+                if raise_errors:
+                    raise
+                return 0
+            self.flushes += 1
+            self.flushed_turns += written
+            return written
+
+    def _write(self, batch):
+        version = analyzer.model_version
+        rows = []
+        for call, turns, _, _, _ in batch:
+            for message, probs, length in turns:
+                record = Message(conversation_id=call.conversation_id, sender=message["sender"],
+                                 text=message["text"], timestamp=message["timestamp"])
+                rows.append((call, record, probs, length))
+        db.session.add_all([record for _, record, _, _ in rows])
+        db.session.flush()
+
+        new_messages = defaultdict(list)
+        emotions = []
+        emotion_store.register_labels(version, analyzer.labels)
+        for call, record, probs, length in rows:
+            scores = analyzer.to_emotions(probs) if length else []
+            # Stored like summarize_emotions does, so a later analyze call rescores nothing
+            emotions.append(MessageEmotion(message_id=record.id, model_version=version,
+                                           probs=emotion_store.encode(probs), token_count=length))
+            new_messages[call.conversation_id].append({"message_id": record.id, "emotions": scores})
+        db.session.add_all(emotions)
+        for call, turns, _, _, _ in batch:
+            last = max(message["timestamp"] for message, _, _ in turns)
+            Conversation.query.filter_by(id=call.conversation_id).update({
+                Conversation.message_count: Conversation.message_count + len(turns),
+                Conversation.last_message_at: func.greatest(func.coalesce(Conversation.last_message_at, last), last)
+            }, synchronize_session=False)
+
+        existing = {
+            result.conversation_id: result
+            for result in AnalysisResult.query.filter(
+                AnalysisResult.conversation_id.in_([call.conversation_id for call, _, _, _, _ in batch]))
+        }
+        old, new = defaultdict(list), defaultdict(list)
+        for call, _, summary, rules, score in batch:
+            messages = call.stored_messages + new_messages[call.conversation_id]
+            emotion_summary = {
+                "emotions": analyzer.to_emotions(summary),
+                "aggregation": call.aggregation,
+                "messages": messages
+            }
+            analysis = existing.get(call.conversation_id)
+            day = call.created_at.date()
+            if analysis is None:
+                analysis = AnalysisResult(conversation_id=call.conversation_id, emotion_summary=emotion_summary,
+                                          compliance_summary=rules, overall_compliance_score=score)
+                db.session.add(analysis)
+            else:
+                old[day].append(rollups.snapshot(analysis))
+                analysis.emotion_summary = emotion_summary
+                analysis.compliance_summary = rules
+                analysis.overall_compliance_score = score
+                analysis.analyzed_at = datetime.utcnow()
+            new[day].append(rollups.snapshot(analysis))
+        for day in sorted(set(old) | set(new)):
+            rollups.apply(day, rollups.combine(old[day]), rollups.combine(new[day]))
+        db.session.commit()
+
+        for call, _, _, _, _ in batch:
+            with call.lock:
+                call.stored_messages = call.stored_messages + new_messages[call.conversation_id]
+        return len(rows)
+
+    def _flush_loop(self):
+        with self._app.app_context():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                    self._expire_idle()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Live call flusher error: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def _expire_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [call for call in self._calls.values() if call.updated_at < cutoff and not call.pending]
+            for call in idle:
+                del self._calls[call.conversation_id]
+        for call in idle:
+            logger.info(f"Live call {call.conversation_id} expired after {self.idle_timeout}s idle")
+
+    def _flush_at_exit(self):
+        if self._flusher_pid != os.getpid() or self._app is None:
+            return
+        with self._app.app_context():
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            calls = list(self._calls.values())
+            subscribers = len(self._subscribers)
+        return {
+            "live_calls": len(calls),
+            "pending_turns": sum(len(call.pending) for call in calls),
+            "subscribers": subscribers,
+            "flushes": self.flushes,
+            "flushed_turns": self.flushed_turns,
+            "flush_errors": self.flush_errors,
+            "dropped_events": self.dropped_events,
+            "batching": self.batcher.stats()
+        }
+
+calls = LiveCalls(
+    max_batch_size=config.LIVE_MAX_BATCH_SIZE,
+    max_wait_ms=config.LIVE_MAX_WAIT_MS,
+    flush_interval=config.LIVE_FLUSH_INTERVAL,
+    idle_timeout=config.LIVE_IDLE_TIMEOUT,
+    subscriber_queue=config.LIVE_SUBSCRIBER_QUEUE
+)
@@ -0,0 +1,201 @@
+import os
+import sys
+import atexit
+import json
+import time
+import queue
+import random
+import logging
+import threading
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import config
+
+# Request id of the request being served on this thread; None in background work
+request_id = contextvars.ContextVar("voiceup_request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_sample_rates = dict(config.LOG_SAMPLE_RATES)
+_state_lock = threading.Lock()
+_handler = None
+
+class Text:
+    """Customer text passed as a log argument; redacted (or truncated) only if the record is emitted."""
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        text = self.text if isinstance(self.text, str) else str(self.text)
+        if config.LOG_REDACT_TEXT:
+            return f"<text: {len(text)} chars>"
+        if len(text) > config.LOG_TEXT_MAX_CHARS:
+            return f"{text[:config.LOG_TEXT_MAX_CHARS]}... ({len(text)} chars)"
+        return text
+
+    __repr__ = __str__
+
+def sample_rate(name):
+    """Debug payload sample rate of a logger, inherited from the closest configured parent."""
+    while name:
+        if name in _sample_rates:
+            return _sample_rates[name]
+        name = name.rpartition(".")[0]
+    return config.LOG_SAMPLE_RATE
+
+def debug_payload(logger, msg, *args):
+    """Log a bulky debug payload for a sampled fraction of calls; costs nothing when DEBUG is off."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    rate = sample_rate(logger.name)
+    if rate < 1.0 and random.random() >= rate:
+        return
+    logger.debug(msg, *args, extra={"sample_rate": rate})
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with extra={...} are included as they are."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "pid": record.process,
+            "thread": record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class _BackgroundHandler(QueueHandler):
+    """Hands records to a listener thread that formats and writes them.
+
+    The calling thread only resolves the message and the request id; JSON
+    encoding and the write happen on the listener. The queue is bounded and
+    records are dropped (and counted) rather than blocking a request when the
+    output cannot keep up. Threads do not survive fork, so each process starts
+    its own listener (and settings watcher) on first use.
+    """
+
+    def __init__(self, target, queue_size):
+        super().__init__(None)
+        self.target = target
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self.addFilter(RequestIdFilter())
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with _state_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue_size)
+            self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            # Write out what is still queued when the process exits
+            atexit.register(self.stop)
+            if config.LOG_CONFIG_PATH:
+                threading.Thread(target=_watch, args=(config.LOG_CONFIG_PATH, config.LOG_CONFIG_POLL_SECONDS),
+                                 name="log-settings-watcher", daemon=True).start()
+
+    def prepare(self, record):
+        # Freeze the arguments now (they may change after this call returns), format later
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def stop(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener, self._pid = None, None
+
+def configure(levels=None, sample_rates=None):
+    """Change logger levels ({"analysis": "DEBUG"}) and debug sample rates at runtime."""
+    for name, level in (levels or {}).items():
+        logging.getLogger(None if name in ("", "root") else name).setLevel(str(level).upper())
+    for name, rate in (sample_rates or {}).items():
+        _sample_rates[name] = min(max(float(rate), 0.0), 1.0)
+
+def settings():
+    loggers = {"root": logging.getLevelName(logging.getLogger().level)}
+    for name, logger in sorted(logging.Logger.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            loggers[name] = logging.getLevelName(logger.level)
+    return {
+        "levels": loggers,
+        "sample_rate": config.LOG_SAMPLE_RATE,
+        "sample_rates": dict(_sample_rates),
+        "redact_text": config.LOG_REDACT_TEXT,
+        "dropped_records": _handler.dropped if _handler else 0
+    }
+
+def _watch(path, interval):
+    # The file holds {"levels": {...}, "sample_rates": {...}}; every process picks up changes
+    modified = None
+    while True:
+        try:
+            mtime = os.stat(path).st_mtime
+            if mtime != modified:
+                modified = mtime
+                with open(path) as f:
+                    overrides = json.load(f)
+                configure(overrides.get("levels"), overrides.get("sample_rates"))
+                logging.getLogger(__name__).info("Applied log settings from %s", path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            logging.getLogger(__name__).warning("Ignoring log settings in %s: %s", path, e)
+        time.sleep(interval)
+
+def setup():
+    """Route all logging through the background handler; safe to call more than once."""
+    global _handler
+    if _handler is not None:
+        return _handler
+    output = logging.StreamHandler(sys.stderr)
+    if config.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s [%(request_id)s] - %(message)s"))
+    _handler = _BackgroundHandler(output, config.LOG_QUEUE_SIZE)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(config.LOG_LEVEL)
+    configure(config.LOG_LEVELS)
+    return _handler
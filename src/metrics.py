@@ -0,0 +1,259 @@
+import time
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Route of the request being served on this thread (or task); "background" otherwise
+current_route = contextvars.ContextVar("voiceup_route", default="background")
+# Per-request timing breakdown, only set when a client asked for profiling
+current_profile = contextvars.ContextVar("voiceup_profile", default=None)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, key, state):
+        counts, total, count = state
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    """Metrics of this process in the Prometheus text exposition format.
+
+    Collectors are callables run at scrape time that return
+    (name, kind, documentation, [(labels dict, value), ...]) tuples, for values
+    other components already keep (cache, micro-batcher, inference pool).
+    Under gunicorn every worker has its own registry and answers for itself.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "voiceup_http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status"))
+http_latency = registry.histogram(
+    "voiceup_http_request_duration_seconds", "Time until the response headers were ready.", ("route", "method"))
+http_in_flight = registry.gauge(
+    "voiceup_http_requests_in_flight", "Requests currently being served.", ("route",))
+classifier_stage = registry.histogram(
+    "voiceup_classifier_stage_seconds", "Classifier time by stage: tokenize, forward or postprocess.", ("stage",))
+classifier_tokens = registry.histogram(
+    "voiceup_classifier_input_tokens", "Token length of classified inputs.", buckets=TOKEN_BUCKETS)
+classifier_long_inputs = registry.counter(
+    "voiceup_classifier_long_inputs_total", "Inputs at or over the model limit, by how they were handled.", ("handling",))
+db_queries = registry.counter(
+    "voiceup_db_queries_total", "SQL statements executed, by route.", ("route",))
+db_query_latency = registry.histogram(
+    "voiceup_db_query_duration_seconds", "SQL statement execution time, by route.", ("route",))
+db_queries_per_request = registry.histogram(
+    "voiceup_db_queries_per_request", "SQL statements issued while serving one request.", ("route",), buckets=COUNT_BUCKETS)
+
+class Profile:
+    """Timing breakdown of one request, returned in a Server-Timing header."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+
+    def add(self, stage, seconds, count=1):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + count
+
+    def server_timing(self):
+        entries = [f'{stage};dur={seconds * 1000:.3f};desc="{self.counts[stage]}x"'
+                   for stage, seconds in sorted(self.stages.items())]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.3f}")
+        return ", ".join(entries)
+
+@contextmanager
+def stage(name):
+    """Time a classifier stage into the stage histogram and the request's profile."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        classifier_stage.observe(elapsed, stage=name)
+        profile = current_profile.get()
+        if profile is not None:
+            profile.add(name, elapsed)
+
+def record_tokens(lengths, limit, handling):
+    """Token lengths of one batch of inputs, and how many reached the model limit."""
+    long_inputs = 0
+    for length in lengths:
+        classifier_tokens.observe(int(length))
+        long_inputs += int(length) >= limit
+    if long_inputs:
+        classifier_long_inputs.inc(long_inputs, handling=handling)
+
+_db_state = threading.local()
+
+# The start time lives on the statement's execution context (the connection when
+# there is none), so a statement that raises leaves nothing behind
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = time.perf_counter()
+    if context is not None:
+        context._voiceup_query_start = started
+    else:
+        conn.info["voiceup_query_start"] = started
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        started = context._voiceup_query_start
+    else:
+        started = conn.info.pop("voiceup_query_start")
+    elapsed = time.perf_counter() - started
+    route = current_route.get()
+    db_queries.inc(route=route)
+    db_query_latency.observe(elapsed, route=route)
+    _db_state.count = getattr(_db_state, "count", 0) + 1
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add("db", elapsed)
+
+def instrument_sqlalchemy():
+    """Count and time every statement of every engine through SQLAlchemy events."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+def reset_query_count():
+    _db_state.count = 0
+
+def query_count():
+    return getattr(_db_state, "count", 0)
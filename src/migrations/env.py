@@ -0,0 +1,38 @@
+import logging
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+import config as settings
+from models import db
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+logger = logging.getLogger("alembic.env")
+
+# Migrations always run against the primary
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+target_metadata = db.metadata
+
+def run_migrations_offline():
+    """Emit the SQL to stdout (alembic upgrade head --sql) instead of running it."""
+    context.configure(url=config.get_main_option("sqlalchemy.url"), target_metadata=target_metadata,
+                      literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    connectable = engine_from_config(config.get_section(config.config_ini_section), prefix="sqlalchemy.",
+                                     poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, compare_type=True,
+                          # Each revision commits on its own, so an autocommit block (CREATE INDEX
+                          # CONCURRENTLY) in one revision does not end another's transaction
+                          transaction_per_migration=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
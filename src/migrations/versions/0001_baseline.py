@@ -0,0 +1,51 @@
+"""Baseline schema: conversations, messages and analysis results
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases created with db.create_all() before migrations existed already
+have these tables; the revision skips whatever is present, so
+"alembic upgrade head" works on them as well as on an empty database.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'conversations' not in existing:
+        op.create_table(
+            'conversations',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('created_at', sa.DateTime, nullable=False)
+        )
+    if 'messages' not in existing:
+        op.create_table(
+            'messages',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('conversation_id', sa.Integer, sa.ForeignKey('conversations.id'), nullable=False),
+            sa.Column('sender', sa.String(50), nullable=False),
+            sa.Column('text', sa.Text, nullable=False),
+            sa.Column('timestamp', sa.DateTime, nullable=False)
+        )
+    if 'analysis_results' not in existing:
+        op.create_table(
+            'analysis_results',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('conversation_id', sa.Integer, sa.ForeignKey('conversations.id'), nullable=False),
+            sa.Column('emotion_summary', JSONB, nullable=False),
+            sa.Column('compliance_summary', JSONB, nullable=False),
+            sa.Column('overall_compliance_score', sa.Integer, nullable=False),
+            sa.Column('analyzed_at', sa.DateTime, nullable=False)
+        )
+
+def downgrade():
+    op.drop_table('analysis_results')
+    op.drop_table('messages')
+    op.drop_table('conversations')
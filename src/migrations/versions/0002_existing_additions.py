@@ -0,0 +1,91 @@
+"""Schema added before migrations existed: external ids, lookup indexes,
+message scores, daily rollups and analysis jobs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Like 0001, every step is skipped when db.create_all() already made it.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+def _indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    columns = {column['name'] for column in inspector.get_columns('conversations')}
+    if 'external_id' not in columns:
+        op.add_column('conversations', sa.Column('external_id', sa.String(255)))
+        op.create_unique_constraint('conversations_external_id_key', 'conversations', ['external_id'])
+    if 'ix_conversations_created_at_id' not in _indexes(inspector, 'conversations'):
+        op.create_index('ix_conversations_created_at_id', 'conversations', ['created_at', 'id'])
+    if 'ix_messages_conversation_id' not in _indexes(inspector, 'messages'):
+        op.create_index('ix_messages_conversation_id', 'messages', ['conversation_id'])
+    analysis_indexes = _indexes(inspector, 'analysis_results')
+    if 'ix_analysis_results_conversation_id' not in analysis_indexes:
+        op.create_index('ix_analysis_results_conversation_id', 'analysis_results', ['conversation_id'])
+    if 'ix_analysis_results_overall_compliance_score' not in analysis_indexes:
+        op.create_index('ix_analysis_results_overall_compliance_score', 'analysis_results', ['overall_compliance_score'])
+
+    if 'message_emotions' not in tables:
+        op.create_table(
+            'message_emotions',
+            sa.Column('message_id', sa.Integer, sa.ForeignKey('messages.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('model_version', sa.String(64), primary_key=True),
+            sa.Column('scores', JSONB, nullable=False),
+            sa.Column('token_count', sa.Integer, nullable=False),
+            sa.Column('created_at', sa.DateTime, nullable=False)
+        )
+    if 'analytics_daily_rollups' not in tables:
+        op.create_table(
+            'analytics_daily_rollups',
+            sa.Column('day', sa.Date, primary_key=True),
+            sa.Column('conversation_count', sa.Integer, nullable=False),
+            sa.Column('compliant_count', sa.Integer, nullable=False),
+            sa.Column('score_sum', sa.BigInteger, nullable=False),
+            sa.Column('score_histogram', JSONB, nullable=False),
+            sa.Column('rule_violations', JSONB, nullable=False),
+            sa.Column('emotion_sums', JSONB, nullable=False),
+            sa.Column('updated_at', sa.DateTime, nullable=False)
+        )
+    if 'analysis_jobs' not in tables:
+        op.create_table(
+            'analysis_jobs',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('status', sa.String(20), nullable=False),
+            sa.Column('params', JSONB, nullable=False),
+            sa.Column('total', sa.Integer),
+            sa.Column('processed', sa.Integer, nullable=False),
+            sa.Column('failed', sa.Integer, nullable=False),
+            sa.Column('last_conversation_id', sa.Integer, nullable=False),
+            sa.Column('worker', sa.String(100)),
+            sa.Column('error', sa.Text),
+            sa.Column('created_at', sa.DateTime, nullable=False),
+            sa.Column('started_at', sa.DateTime),
+            sa.Column('heartbeat_at', sa.DateTime),
+            sa.Column('finished_at', sa.DateTime),
+            sa.Column('run_started_at', sa.DateTime),
+            sa.Column('run_processed', sa.Integer, nullable=False)
+        )
+        op.create_index('ix_analysis_jobs_status', 'analysis_jobs', ['status'])
+
+def downgrade():
+    op.drop_table('analysis_jobs')
+    op.drop_table('analytics_daily_rollups')
+    op.drop_table('message_emotions')
+    op.drop_index('ix_analysis_results_overall_compliance_score', 'analysis_results')
+    op.drop_index('ix_analysis_results_conversation_id', 'analysis_results')
+    op.drop_index('ix_messages_conversation_id', 'messages')
+    op.drop_index('ix_conversations_created_at_id', 'conversations')
+    op.drop_constraint('conversations_external_id_key', 'conversations')
+    op.drop_column('conversations', 'external_id')
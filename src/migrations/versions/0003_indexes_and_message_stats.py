@@ -0,0 +1,76 @@
+"""Composite and unique lookup indexes, GIN on emotion_summary, and
+denormalized message_count/last_message_at on conversations
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Indexes on the large tables are built with CREATE INDEX CONCURRENTLY so
+ingestion and analysis keep running. If older rows held several analysis
+results for one conversation, all but the newest are deleted first; run
+"python rollups.py rebuild" afterwards in that case.
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+def _indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'message_count' not in {column['name'] for column in inspector.get_columns('conversations')}:
+        op.add_column('conversations', sa.Column('message_count', sa.Integer, nullable=False, server_default='0'))
+        op.add_column('conversations', sa.Column('last_message_at', sa.DateTime))
+        op.execute("""
+            UPDATE conversations c SET message_count = s.message_count, last_message_at = s.last_message_at
+            FROM (SELECT conversation_id, count(*) AS message_count, max(timestamp) AS last_message_at
+                  FROM messages GROUP BY conversation_id) s
+            WHERE s.conversation_id = c.id
+        """)
+
+    removed = op.get_bind().execute(sa.text("""
+        DELETE FROM analysis_results a USING analysis_results b
+        WHERE a.conversation_id = b.conversation_id AND a.id < b.id
+    """)).rowcount
+    if removed:
+        logger.warning(f"Removed {removed} duplicate analysis results; run 'python rollups.py rebuild'")
+
+    messages_indexes = _indexes(inspector, 'messages')
+    analysis_indexes = _indexes(inspector, 'analysis_results')
+    unique = {constraint['name'] for constraint in inspector.get_unique_constraints('analysis_results')}
+    with op.get_context().autocommit_block():
+        if 'ix_messages_conversation_id_timestamp' not in messages_indexes:
+            op.create_index('ix_messages_conversation_id_timestamp', 'messages', ['conversation_id', 'timestamp'],
+                            postgresql_concurrently=True)
+        if 'uq_analysis_results_conversation_id' not in unique:
+            op.create_index('uq_analysis_results_conversation_id', 'analysis_results', ['conversation_id'],
+                            unique=True, postgresql_concurrently=True)
+        if 'ix_analysis_results_emotion_summary' not in analysis_indexes:
+            op.create_index('ix_analysis_results_emotion_summary', 'analysis_results', ['emotion_summary'],
+                            postgresql_using='gin', postgresql_ops={'emotion_summary': 'jsonb_path_ops'},
+                            postgresql_concurrently=True)
+
+    if 'uq_analysis_results_conversation_id' not in unique:
+        # Promote the index built above; this only takes a brief lock
+        op.execute("ALTER TABLE analysis_results ADD CONSTRAINT uq_analysis_results_conversation_id "
+                   "UNIQUE USING INDEX uq_analysis_results_conversation_id")
+    # Both are leading-column prefixes of the new indexes
+    op.execute("DROP INDEX IF EXISTS ix_messages_conversation_id")
+    op.execute("DROP INDEX IF EXISTS ix_analysis_results_conversation_id")
+
+def downgrade():
+    op.create_index('ix_analysis_results_conversation_id', 'analysis_results', ['conversation_id'])
+    op.create_index('ix_messages_conversation_id', 'messages', ['conversation_id'])
+    op.drop_index('ix_analysis_results_emotion_summary', 'analysis_results')
+    op.drop_constraint('uq_analysis_results_conversation_id', 'analysis_results')
+    op.drop_index('ix_messages_conversation_id_timestamp', 'messages')
+    op.drop_column('conversations', 'last_message_at')
+    op.drop_column('conversations', 'message_count')
@@ -0,0 +1,28 @@
+"""Shared version counters for HTTP response caching
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Skipped when db.create_all() already made the table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'cache_versions' not in inspector.get_table_names():
+        op.create_table(
+            'cache_versions',
+            sa.Column('scope', sa.String(100), primary_key=True),
+            sa.Column('version', sa.BigInteger, nullable=False),
+            sa.Column('updated_at', sa.DateTime, nullable=False)
+        )
+
+def downgrade():
+    op.drop_table('cache_versions')
@@ -0,0 +1,40 @@
+"""Per-message probability vectors as bytes, with the label order per model version
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Existing rows keep their JSON scores and are read through them until the
+conversation is re-analyzed with full=true. Like 0001-0004, each step is
+skipped when db.create_all() already made it.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'emotion_label_sets' not in inspector.get_table_names():
+        op.create_table(
+            'emotion_label_sets',
+            sa.Column('model_version', sa.String(64), primary_key=True),
+            sa.Column('labels', JSONB, nullable=False),
+            sa.Column('created_at', sa.DateTime, nullable=False, server_default=sa.func.now())
+        )
+    columns = {column['name']: column for column in inspector.get_columns('message_emotions')}
+    if 'probs' not in columns:
+        op.add_column('message_emotions', sa.Column('probs', sa.LargeBinary))
+    if not columns['scores']['nullable']:
+        op.alter_column('message_emotions', 'scores', nullable=True)
+
+def downgrade():
+    # Rows holding only vectors have no JSON form to fall back to
+    op.execute("DELETE FROM message_emotions WHERE scores IS NULL")
+    op.alter_column('message_emotions', 'scores', nullable=False)
+    op.drop_column('message_emotions', 'probs')
+    op.drop_table('emotion_label_sets')
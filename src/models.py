@@ -1,21 +1,34 @@
-from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
+from database import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 
 class Conversation(db.Model):
     __tablename__ = 'conversations'
+    __table_args__ = (
+        # Keyset pagination and date-range filters walk this index
+        db.Index('ix_conversations_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    # Client-supplied key that makes bulk ingestion idempotent
+    external_id = db.Column(db.String(255), unique=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Denormalized from messages by every code path that inserts them
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_message_at = db.Column(db.DateTime)
     
     # Relationships
-    messages = db.relationship('Message', backref='conversation', cascade='all, delete-orphan')
+    messages = db.relationship('Message', backref='conversation', cascade='all, delete-orphan', order_by='Message.timestamp')
     analysis_result = db.relationship('AnalysisResult', backref='conversation', uselist=False, cascade='all, delete-orphan')
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        # A conversation's messages in order, without a sort
+        db.Index('ix_messages_conversation_id_timestamp', 'conversation_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
@@ -25,10 +38,81 @@ class Message(db.Model):
 
 class AnalysisResult(db.Model):
     __tablename__ = 'analysis_results'
+    __table_args__ = (
+        # Exactly one result per conversation
+        db.UniqueConstraint('conversation_id', name='uq_analysis_results_conversation_id'),
+        # Containment (@>) filters on the summary, e.g. the result holding a given message
+        db.Index('ix_analysis_results_emotion_summary', 'emotion_summary',
+                 postgresql_using='gin', postgresql_ops={'emotion_summary': 'jsonb_path_ops'}),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
     emotion_summary = db.Column(JSONB, nullable=False)
     compliance_summary = db.Column(JSONB, nullable=False)
-    overall_compliance_score = db.Column(db.Integer, nullable=False)
-    analyzed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
\ No newline at end of file
+    overall_compliance_score = db.Column(db.Integer, nullable=False, index=True)
+    analyzed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class MessageEmotion(db.Model):
+    __tablename__ = 'message_emotions'
+    
+    # One row per message and model version, so a model swap never mixes scores
+    message_id = db.Column(db.Integer, db.ForeignKey('messages.id', ondelete='CASCADE'), primary_key=True)
+    model_version = db.Column(db.String(64), primary_key=True)
+    # Raw probabilities as float16/float32 bytes in the label order of EmotionLabelSet (emotion_store.py)
+    probs = db.Column(db.LargeBinary)
+    # [{label, score}] of rows stored before probs existed
+    scores = db.Column(JSONB)
+    token_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class EmotionLabelSet(db.Model):
+    __tablename__ = 'emotion_label_sets'
+    
+    # Which label each position of a model version's stored vectors stands for
+    model_version = db.Column(db.String(64), primary_key=True)
+    labels = db.Column(JSONB, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class AnalyticsDailyRollup(db.Model):
+    __tablename__ = 'analytics_daily_rollups'
+    
+    # Keyed by the conversation's creation day; maintained by rollups.py
+    day = db.Column(db.Date, primary_key=True)
+    conversation_count = db.Column(db.Integer, nullable=False, default=0)
+    compliant_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    score_histogram = db.Column(JSONB, nullable=False, default=dict)
+    rule_violations = db.Column(JSONB, nullable=False, default=dict)
+    emotion_sums = db.Column(JSONB, nullable=False, default=dict)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+class AnalysisJob(db.Model):
+    __tablename__ = 'analysis_jobs'
+    
+    # Bulk re-analysis runs queued through this table and executed by jobs.py
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    params = db.Column(JSONB, nullable=False, default=dict)
+    total = db.Column(db.Integer)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    # Checkpoint: every conversation up to this id has been committed
+    last_conversation_id = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(100))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Where the current run started, for throughput after a resume
+    run_started_at = db.Column(db.DateTime)
+    run_processed = db.Column(db.Integer, nullable=False, default=0)
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'
+    
+    # Freshness counters behind response ETags ("analytics", "conversation:<id>"); see response_cache.py
+    scope = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
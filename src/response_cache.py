@@ -0,0 +1,158 @@
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
+import config
+import metrics
+from database import RoutingSession
+from models import db, Conversation, Message, AnalysisResult, AnalyticsDailyRollup, CacheVersion
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_SCOPE = 'analytics'
+
+response_cache_requests = metrics.registry.counter(
+    "voiceup_response_cache_requests_total",
+    "Cacheable GET requests by route and outcome: not_modified, hit or miss.", ("route", "outcome"))
+
+def conversation_scope(conversation_id):
+    return f"conversation:{conversation_id}"
+
+class ResponseCache:
+    """Rendered GET responses of read endpoints, validated by shared version counters.
+
+    Every cacheable response belongs to a scope whose counter lives in the
+    cache_versions table, so all workers (and hosts) agree on freshness. A
+    request costs one primary-key lookup of its counter: a matching
+    If-None-Match gets 304, a cached body at the same version is replayed, and
+    only otherwise does the view run. Counters are bumped in the transaction
+    that changes the underlying rows (see _collect_scopes), so a commit
+    invalidates exactly the conversations it touched plus the analytics. The
+    in-memory store is an LRU bounded by body bytes, per process.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = (version, body, mimetype)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes}
+
+cache = ResponseCache(config.RESPONSE_CACHE_MAX_BYTES)
+
+def collect_cache_metrics():
+    stats = cache.stats()
+    return [
+        ('voiceup_response_cache_entries', 'gauge', 'Responses held in the response cache.', [({}, stats['entries'])]),
+        ('voiceup_response_cache_bytes', 'gauge', 'Body bytes held in the response cache.', [({}, stats['bytes'])])
+    ]
+
+metrics.registry.add_collector(collect_cache_metrics)
+
+def current_version(scope):
+    version = db.session.query(CacheVersion.version).filter_by(scope=scope).scalar()
+    return version or 0
+
+def cached(scope_for):
+    """Cache a GET view's 200 responses under scope_for(**view_args)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if not config.RESPONSE_CACHE:
+                return view(**kwargs)
+            scope = scope_for(**kwargs)
+            route = request.url_rule.rule
+            try:
+                version = current_version(scope)
+            except Exception as e:
+                # Without a version nothing can be validated; serve uncached
+                db.session.rollback()
+                logger.warning(f"Response cache version lookup failed for {scope}: {str(e)}")
+                return view(**kwargs)
+            etag = f"{scope}-{version}"
+            if request.if_none_match.contains(etag):
+                response_cache_requests.inc(route=route, outcome='not_modified')
+                response = Response(status=304)
+            else:
+                key = request.full_path
+                entry = cache.get(key, version)
+                if entry is not None:
+                    response_cache_requests.inc(route=route, outcome='hit')
+                    response = Response(entry[1], mimetype=entry[2])
+                else:
+                    response_cache_requests.inc(route=route, outcome='miss')
+                    response = view(**kwargs)
+                    if isinstance(response, tuple) or response.status_code != 200:
+                        return response
+                    cache.put(key, version, response.get_data(), response.mimetype)
+            response.set_etag(etag)
+            # Clients may keep the body but must revalidate before every use
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+def invalidate(*scopes):
+    """Bump scopes on commit of the current transaction, for changes the flush hooks cannot see."""
+    db.session.info.setdefault('cache_scopes', set()).update(scopes)
+
+def _collect_scopes(session, flush_context):
+    scopes = session.info.setdefault('cache_scopes', set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, (Message, AnalysisResult)):
+            scopes.add(conversation_scope(instance.conversation_id))
+        elif isinstance(instance, Conversation):
+            scopes.add(conversation_scope(instance.id))
+        if isinstance(instance, (AnalysisResult, AnalyticsDailyRollup)):
+            scopes.add(ANALYTICS_SCOPE)
+
+def _bump_versions(session):
+    # Flush first so the last changes are collected; the counter rows are then only
+    # locked from here to COMMIT, not for the whole transaction
+    session.flush()
+    scopes = session.info.pop('cache_scopes', None)
+    if not scopes:
+        return
+    table = CacheVersion.__table__
+    statement = insert(table).values([
+        {'scope': scope, 'version': 1, 'updated_at': datetime.utcnow()} for scope in sorted(scopes)
+    ])
+    session.execute(statement.on_conflict_do_update(
+        index_elements=['scope'],
+        set_={'version': table.c.version + 1, 'updated_at': statement.excluded.updated_at}
+    ))
+
+def _discard_scopes(session):
+    session.info.pop('cache_scopes', None)
+
+event.listen(RoutingSession, 'after_flush', _collect_scopes)
+event.listen(RoutingSession, 'before_commit', _bump_versions)
+event.listen(RoutingSession, 'after_rollback', _discard_scopes)
@@ -0,0 +1,187 @@
+import sys
+import logging
+from datetime import time, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from models import db, AnalyticsDailyRollup
+
+logger = logging.getLogger(__name__)
+
+COMPLIANT_SCORE = 80
+SCORE_BUCKETS = ((0, 20), (21, 40), (41, 60), (61, 80), (81, 100))
+
+# Rows whose emotion_summary has no 'emotions' array contribute nothing
+EMOTION_ELEMENTS = """
+    FROM analysis_results a
+    JOIN conversations c ON c.id = a.conversation_id
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(a.emotion_summary -> 'emotions') = 'array'
+             THEN a.emotion_summary -> 'emotions' ELSE '[]'::jsonb END
+    ) AS e
+    WHERE e ->> 'label' IS NOT NULL AND e ->> 'score' IS NOT NULL
+"""
+
+def score_bucket(score):
+    for low, high in SCORE_BUCKETS:
+        if score <= high:
+            return f"{low}-{high}"
+    return f"{SCORE_BUCKETS[-1][0]}-{SCORE_BUCKETS[-1][1]}"
+
+def empty_histogram():
+    return {f"{low}-{high}": 0 for low, high in SCORE_BUCKETS}
+
+def snapshot(analysis):
+    """The contribution one AnalysisResult makes to its day's rollup."""
+    summary = analysis.emotion_summary if isinstance(analysis.emotion_summary, dict) else {}
+    emotions = summary.get('emotions', [])
+    score = analysis.overall_compliance_score
+    return {
+        'conversations': 1,
+        'compliant': 1 if score >= COMPLIANT_SCORE else 0,
+        'score_sum': score,
+        'histogram': {score_bucket(score): 1},
+        'rule_violations': {rule: 1 for rule, passed in (analysis.compliance_summary or {}).items() if not passed},
+        'emotion_sums': {
+            item['label']: float(item['score'])
+            for item in emotions if isinstance(item, dict) and item.get('label') and item.get('score') is not None
+        }
+    }
+
+def _merge(counts, delta, sign):
+    merged = dict(counts)
+    for key, value in delta.items():
+        merged[key] = merged.get(key, 0) + sign * value
+        if isinstance(merged[key], float):
+            merged[key] = round(merged[key], 6)
+    return merged
+
+def combine(contributions):
+    """Sum several snapshots into one, so a batch touches each day's row once."""
+    total = None
+    for contribution in contributions:
+        if not contribution:
+            continue
+        if total is None:
+            total = {'conversations': 0, 'compliant': 0, 'score_sum': 0,
+                     'histogram': {}, 'rule_violations': {}, 'emotion_sums': {}}
+        for key in ('conversations', 'compliant', 'score_sum'):
+            total[key] += contribution[key]
+        for key in ('histogram', 'rule_violations', 'emotion_sums'):
+            total[key] = _merge(total[key], contribution[key], 1)
+    return total
+
+def apply(day, old=None, new=None):
+    """Replace one conversation's contribution to `day` (old -> new) in the current transaction.
+
+    The day row is locked with SELECT ... FOR UPDATE, so concurrent analyses of
+    conversations from the same day serialize instead of losing updates.
+    """
+    db.session.execute(
+        insert(AnalyticsDailyRollup.__table__)
+        .values(day=day, conversation_count=0, compliant_count=0, score_sum=0,
+                score_histogram={}, rule_violations={}, emotion_sums={})
+        .on_conflict_do_nothing(index_elements=['day'])
+    )
+    row = AnalyticsDailyRollup.query.filter_by(day=day).with_for_update().one()
+    for contribution, sign in ((old, -1), (new, 1)):
+        if not contribution:
+            continue
+        row.conversation_count += sign * contribution['conversations']
+        row.compliant_count += sign * contribution['compliant']
+        row.score_sum += sign * contribution['score_sum']
+        # JSONB columns are reassigned, not mutated, so the ORM sees the change
+        row.score_histogram = _merge(row.score_histogram, contribution['histogram'], sign)
+        row.rule_violations = _merge(row.rule_violations, contribution['rule_violations'], sign)
+        row.emotion_sums = _merge(row.emotion_sums, contribution['emotion_sums'], sign)
+    return row
+
+def query_days(date_from=None, date_to=None):
+    """Rollup rows ordered by day; date_to is exclusive, as returned by parse_date_range."""
+    query = AnalyticsDailyRollup.query
+    if date_from:
+        query = query.filter(AnalyticsDailyRollup.day >= date_from.date())
+    if date_to:
+        end = date_to.date() if date_to.time() == time.min else date_to.date() + timedelta(days=1)
+        query = query.filter(AnalyticsDailyRollup.day < end)
+    return query.order_by(AnalyticsDailyRollup.day).all()
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def rebuild():
+    """Regenerate every rollup row from analysis_results and conversations."""
+    day_sql = "(c.created_at)::date"
+    days = {}
+    # Analyses committing meanwhile block in apply() until the rebuilt rows exist,
+    # then add their delta on top of them
+    db.session.execute(text("LOCK TABLE analytics_daily_rollups IN SHARE ROW EXCLUSIVE MODE"))
+
+    def row_for(day):
+        if day not in days:
+            days[day] = AnalyticsDailyRollup(
+                day=day, conversation_count=0, compliant_count=0, score_sum=0,
+                score_histogram=empty_histogram(), rule_violations={}, emotion_sums={}
+            )
+        return days[day]
+
+    totals = db.session.execute(text(
+        f"SELECT {day_sql} AS day, COUNT(*) AS conversations,"
+        " SUM(CASE WHEN a.overall_compliance_score >= :threshold THEN 1 ELSE 0 END) AS compliant,"
+        " SUM(a.overall_compliance_score) AS score_sum"
+        " FROM analysis_results a JOIN conversations c ON c.id = a.conversation_id GROUP BY day"
+    ), {'threshold': COMPLIANT_SCORE})
+    for row in totals:
+        rollup = row_for(row.day)
+        rollup.conversation_count = row.conversations
+        rollup.compliant_count = row.compliant
+        rollup.score_sum = row.score_sum
+
+    cases = " ".join(
+        f"WHEN a.overall_compliance_score <= {high} THEN '{low}-{high}'" for low, high in SCORE_BUCKETS[:-1]
+    )
+    last_low, last_high = SCORE_BUCKETS[-1]
+    histogram = db.session.execute(text(
+        f"SELECT {day_sql} AS day, CASE {cases} ELSE '{last_low}-{last_high}' END AS bucket, COUNT(*) AS total"
+        " FROM analysis_results a JOIN conversations c ON c.id = a.conversation_id GROUP BY day, bucket"
+    ))
+    for row in histogram:
+        rollup = row_for(row.day)
+        rollup.score_histogram = {**rollup.score_histogram, row.bucket: row.total}
+
+    violations = db.session.execute(text(
+        f"SELECT {day_sql} AS day, r.key AS rule, COUNT(*) AS total"
+        " FROM analysis_results a JOIN conversations c ON c.id = a.conversation_id"
+        " CROSS JOIN LATERAL jsonb_each(CASE WHEN jsonb_typeof(a.compliance_summary) = 'object'"
+        " THEN a.compliance_summary ELSE '{}'::jsonb END) AS r"
+        " WHERE r.value = 'false'::jsonb GROUP BY day, rule"
+    ))
+    for row in violations:
+        rollup = row_for(row.day)
+        rollup.rule_violations = {**rollup.rule_violations, row.rule: row.total}
+
+    emotions = db.session.execute(text(
+        f"SELECT {day_sql} AS day, e ->> 'label' AS label, SUM((e ->> 'score')::float) AS total"
+        + EMOTION_ELEMENTS + " GROUP BY day, label"
+    ))
+    for row in emotions:
+        rollup = row_for(row.day)
+        rollup.emotion_sums = {**rollup.emotion_sums, row.label: round(row.total, 6)}
+
+    AnalyticsDailyRollup.query.delete()
+    db.session.add_all(days.values())
+    db.session.commit()
+    logger.info(f"Rebuilt analytics rollups for {len(days)} days")
+    return len(days)
+
+if __name__ == "__main__":
+    from app import app
+
+    if len(sys.argv) != 2 or sys.argv[1] != "rebuild":
+        print("Usage: python rollups.py rebuild")
+        sys.exit(1)
+    with app.app_context():
+        print(f"Rebuilt analytics rollups for {rebuild()} days")
@@ -0,0 +1,76 @@
+import logging
+import numpy as np
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+from models import db, MessageEmotion
+from analysis import analyzer
+import emotion_store
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement, well under the driver's bind parameter limit
+UPSERT_ROWS = 1000
+
+def summarize_many(conversations, aggregation, full=False):
+    """Roll stored per-message emotion scores up into one emotion_summary per conversation.
+
+    conversations is a list of message lists. Messages without a MessageEmotion row
+    for the current model version (all of them when full is set) are scored in a
+    single message_scores call, so conversations share inference batches; the rest
+    are read back from their stored vectors, so a different aggregation over
+    scored conversations needs no inference. Returns [(emotion_summary, newly
+    scored messages)].
+    """
+    version = analyzer.model_version
+    message_ids = [msg.id for messages in conversations for msg in messages]
+    stored = {
+        row.message_id: (row.probs, row.scores, row.token_count)
+        for row in db.session.query(MessageEmotion.message_id, MessageEmotion.probs,
+                                    MessageEmotion.scores, MessageEmotion.token_count).filter(
+            MessageEmotion.message_id.in_(message_ids),
+            MessageEmotion.model_version == version
+        )
+    } if message_ids else {}
+
+    pending = [[msg for msg in messages if full or msg.id not in stored] for messages in conversations]
+    scored = [msg for messages in pending for msg in messages]
+    if scored:
+        probs, lengths = analyzer.message_scores([msg.text for msg in scored])
+        emotion_store.register_labels(version, analyzer.labels)
+        rows = [{
+            'message_id': msg.id, 'model_version': version, 'probs': emotion_store.encode(row),
+            'scores': None, 'token_count': int(length), 'created_at': datetime.utcnow()
+        } for msg, row, length in zip(scored, probs, lengths)]
+        # An upsert, so concurrent analyses of the same messages do not collide on the primary key
+        for start in range(0, len(rows), UPSERT_ROWS):
+            statement = insert(MessageEmotion.__table__).values(rows[start:start + UPSERT_ROWS])
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=['message_id', 'model_version'],
+                set_={'probs': statement.excluded.probs, 'scores': None, 'token_count': statement.excluded.token_count}
+            ))
+        stored.update((row['message_id'], (row['probs'], None, row['token_count'])) for row in rows)
+    logger.debug("Scored %d of %d messages with model %s", len(scored), len(message_ids), version)
+
+    # Every vector of the batch is decoded at once
+    all_probs = emotion_store.decode_many([stored[msg_id][:2] for msg_id in message_ids], analyzer.labels)
+    all_lengths = np.array([stored[msg_id][2] for msg_id in message_ids], dtype=np.int64)
+
+    results, offset = [], 0
+    for messages, new_messages in zip(conversations, pending):
+        probs = all_probs[offset:offset + len(messages)]
+        lengths = all_lengths[offset:offset + len(messages)]
+        offset += len(messages)
+        summary = analyzer.aggregate(probs, lengths, aggregation)
+        results.append(({
+            "emotions": analyzer.to_emotions(summary),
+            "aggregation": aggregation,
+            "messages": [
+                {"message_id": msg.id, "emotions": analyzer.to_emotions(row) if length else []}
+                for msg, row, length in zip(messages, probs, lengths)
+            ]
+        }, new_messages))
+    return results
+
+def summarize_emotions(messages, aggregation, full=False):
+    """summarize_many for a single conversation; returns (emotion_summary, newly scored messages)."""
+    return summarize_many([messages], aggregation, full)[0]
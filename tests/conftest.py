@@ -0,0 +1,107 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# Database tests run against a disposable Postgres database given here; they are
+# skipped otherwise. It must be set before config is imported.
+TEST_DATABASE_URL = os.getenv("VOICEUP_TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["VOICEUP_DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.pop("VOICEUP_DATABASE_REPLICA_URL", None)
+os.environ["VOICEUP_MODEL_LOADING"] = "lazy"
+
+LABELS = ["joy", "anger", "neutral"]
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The Flask app bound to the test database, with the schema created."""
+    pytest.importorskip("flask_sqlalchemy")
+    if not TEST_DATABASE_URL:
+        pytest.skip("VOICEUP_TEST_DATABASE_URL is not set")
+    from app import app as flask_app
+    from models import db
+
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def session(app):
+    """db.session inside an app context; every table is emptied afterwards."""
+    import response_cache
+    from models import db
+
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        db.session.remove()
+    response_cache.cache = response_cache.ResponseCache(response_cache.cache.max_bytes)
+
+
+@pytest.fixture
+def client(app, session):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_conversation(session):
+    """Build committed conversations from (sender, text) turns, one second apart."""
+    from models import Conversation, Message
+
+    def make(turns, created_at=None, external_id=None):
+        created_at = created_at or datetime(2024, 3, 4, 9, 0)
+        conversation = Conversation(external_id=external_id, created_at=created_at, message_count=len(turns))
+        conversation.messages = [
+            Message(sender=sender, text=text, timestamp=created_at + timedelta(seconds=i))
+            for i, (sender, text) in enumerate(turns)
+        ]
+        if turns:
+            conversation.last_message_at = conversation.messages[-1].timestamp
+        session.add(conversation)
+        session.commit()
+        return conversation
+    return make
+
+
+def fake_scores(texts):
+    """Stand-in for EmotionAnalyzer.message_scores: anger for "!", joy for "thanks", else neutral."""
+    probs = np.zeros((len(texts), len(LABELS)), dtype=np.float32)
+    lengths = np.zeros(len(texts), dtype=np.int64)
+    for i, text in enumerate(texts):
+        if not text.strip():
+            continue
+        lengths[i] = len(text.split())
+        if "!" in text:
+            probs[i] = [0.1, 0.8, 0.1]
+        elif "thanks" in text.lower():
+            probs[i] = [0.8, 0.1, 0.1]
+        else:
+            probs[i] = [0.1, 0.1, 0.8]
+    return probs, lengths
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """The shared analyzer, marked loaded with LABELS and scoring through fake_scores."""
+    from analysis import analyzer
+
+    monkeypatch.setattr(analyzer, "_loaded", True)
+    monkeypatch.setattr(analyzer, "_labels", LABELS, raising=False)
+    monkeypatch.setattr(analyzer, "_label_index", {label: i for i, label in enumerate(LABELS)}, raising=False)
+    monkeypatch.setattr(analyzer, "_model_version", "test-model", raising=False)
+    monkeypatch.setattr(analyzer, "message_scores", fake_scores)
+    return analyzer
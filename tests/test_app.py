@@ -0,0 +1,80 @@
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from models import AnalysisResult, Message
+
+TURNS = [("agent", "Hello, how can I help?"), ("customer", "My order is late!")]
+
+
+def _add_message(session, conversation, sender, text):
+    message = Message(conversation_id=conversation.id, sender=sender, text=text,
+                      timestamp=conversation.last_message_at + timedelta(seconds=1))
+    conversation.message_count += 1
+    conversation.last_message_at = message.timestamp
+    session.add(message)
+    session.commit()
+    return message
+
+
+def test_incremental_analysis_folds_message_scored_on_its_own(client, session, model, make_conversation):
+    conversation = make_conversation(TURNS)
+    response = client.post(f"/api/conversations/{conversation.id}/analyze")
+    assert response.status_code == 200
+    assert response.get_json()["compliance_summary"]["no_unsupported_claims"] is True
+
+    message = _add_message(session, conversation, "agent", "It is guaranteed to arrive tomorrow")
+    assert client.post(f"/api/messages/{message.id}/analyze").status_code == 200
+
+    response = client.post(f"/api/conversations/{conversation.id}/analyze")
+    assert response.status_code == 200
+    assert response.get_json()["compliance_summary"]["no_unsupported_claims"] is False
+    stored = AnalysisResult.query.filter_by(conversation_id=conversation.id).one()
+    assert [item["message_id"] for item in stored.emotion_summary["messages"]][-1] == message.id
+
+
+def test_cursor_round_trip():
+    from app import decode_cursor, encode_cursor
+
+    created_at = datetime(2024, 3, 4, 9, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+def test_conversations_pages_follow_cursor(client, make_conversation):
+    created_at = datetime(2024, 3, 4, 9, 0)
+    # Three share a timestamp, so the id breaks the tie
+    ids = [make_conversation(TURNS, created_at + timedelta(minutes=minutes)).id for minutes in (0, 0, 0, 1, 2)]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = client.get("/api/conversations", query_string={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [item["id"] for item in response.get_json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert pages == 3
+    assert seen == [ids[4], ids[3], ids[2], ids[1], ids[0]]
+
+
+def test_conversations_last_page_has_no_cursor(client, make_conversation):
+    make_conversation(TURNS)
+    make_conversation(TURNS)
+    response = client.get("/api/conversations", query_string={"limit": 2})
+    assert len(response.get_json()) == 2
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b"yesterday|1").decode(),
+    base64.urlsafe_b64encode(b"2024-03-04T09:00:00").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+])
+def test_conversations_rejects_tampered_cursor(client, cursor):
+    response = client.get("/api/conversations", query_string={"cursor": cursor})
+    assert response.status_code == 400
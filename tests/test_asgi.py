@@ -0,0 +1,93 @@
+import asyncio
+import importlib
+import sys
+import threading
+import types
+
+import pytest
+
+routing = pytest.importorskip("werkzeug.routing")
+
+import config
+
+
+class _FakeFlask:
+    """Just enough of the Flask app for VoiceUpASGI: a url_map and a WSGI callable."""
+
+    def __init__(self):
+        self.url_map = routing.Map([
+            routing.Rule('/api/live/events', endpoint='live_events'),
+            routing.Rule('/api/conversations', endpoint='get_conversations'),
+            routing.Rule('/api/analyze', endpoint='analyze_text'),
+        ])
+        self.release = threading.Event()
+
+    def __call__(self, environ, start_response):
+        if environ['PATH_INFO'] == '/api/live/events':
+            start_response('200 OK', [('Content-Type', 'text/event-stream')])
+            return self._events()
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [b'[]']
+
+    def _events(self):
+        yield b'data: {}\n\n'
+        self.release.wait(5)
+
+
+@pytest.fixture
+def asgi(monkeypatch):
+    flask_app = _FakeFlask()
+    monkeypatch.setitem(sys.modules, 'app', types.SimpleNamespace(app=flask_app))
+    monkeypatch.delitem(sys.modules, 'asgi', raising=False)
+    monkeypatch.setattr(config, 'ASGI_READ_CONCURRENCY', 1)
+    monkeypatch.setattr(config, 'ASGI_QUEUE_TIMEOUT', 0.5)
+    module = importlib.import_module('asgi')
+    server = module.VoiceUpASGI(flask_app)
+    yield server
+    flask_app.release.set()
+    for lane in server.lanes.values():
+        lane.executor.shutdown(wait=True)
+
+
+def _scope(path):
+    return {"type": "http", "method": "GET", "path": path, "query_string": b"",
+            "headers": [], "http_version": "1.1"}
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def test_route_picks_lane(asgi):
+    from asgi import _environ
+
+    assert asgi.route(_environ(_scope('/api/live/events')))[0].name == 'stream'
+    assert asgi.route(_environ(_scope('/api/analyze')))[0].name == 'inference'
+    assert asgi.route(_environ(_scope('/api/conversations')))[0].name == 'read'
+
+
+def test_open_stream_does_not_hold_read_slot(asgi):
+    async def scenario():
+        stream_started = asyncio.Event()
+        read_messages = []
+
+        async def stream_send(message):
+            if message["type"] == "http.response.start":
+                stream_started.set()
+
+        async def read_send(message):
+            read_messages.append(message)
+
+        stream = asyncio.ensure_future(asgi(_scope('/api/live/events'), _receive, stream_send))
+        await asyncio.wait_for(stream_started.wait(), 2)
+        # The only read slot is free while the stream stays open
+        await asyncio.wait_for(asgi(_scope('/api/conversations'), _receive, read_send), 2)
+        stats = asgi.stats()
+        asgi.wsgi_app.release.set()
+        await asyncio.wait_for(stream, 2)
+        return read_messages, stats
+
+    read_messages, stats = asyncio.run(scenario())
+    assert read_messages[0]["status"] == 200
+    assert stats['stream']['active'] == 1
+    assert stats['read']['rejected'] == 0
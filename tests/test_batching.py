@@ -0,0 +1,25 @@
+import metrics
+from batching import MicroBatcher
+
+
+def _predict(texts):
+    with metrics.stage("forward"):
+        return [text.upper() for text in texts]
+
+
+def test_profiled_caller_gets_batch_stages():
+    batcher = MicroBatcher(_predict, max_batch_size=4, max_wait_ms=1)
+    profile = metrics.Profile()
+    token = metrics.current_profile.set(profile)
+    try:
+        assert batcher.submit("hello") == "HELLO"
+    finally:
+        metrics.current_profile.reset(token)
+    assert set(profile.stages) == {"batch_wait", "forward"}
+    assert profile.counts["forward"] == 1
+
+
+def test_unprofiled_caller_adds_nothing():
+    batcher = MicroBatcher(_predict, max_batch_size=4, max_wait_ms=1)
+    assert batcher.submit("hello") == "HELLO"
+    assert batcher.stats()["items"] == 1
@@ -0,0 +1,73 @@
+import os
+
+from cache import EmotionCache, model_identity, normalize_text
+
+RESULT = [{"label": "joy", "score": 0.9}, {"label": "anger", "score": 0.1}]
+
+
+def test_normalize_text():
+    assert normalize_text("  Hello \t\n world  ") == "Hello world"
+    # Composed and decomposed forms of "é" share a key
+    assert normalize_text("caf\u00e9") == normalize_text("cafe\u0301")
+
+
+def test_key_ignores_whitespace_and_keeps_case():
+    cache = EmotionCache("model-a")
+    assert cache.key("Hello  world") == cache.key(" Hello world\n")
+    assert cache.key("Hello world") != cache.key("hello world")
+
+
+def test_lru_bound_and_copies():
+    cache = EmotionCache("model-a", max_entries=2)
+    cache.put_many({"one": RESULT, "two": RESULT})
+    assert cache.get("one") == RESULT
+    cache.put("three", RESULT)
+    # "two" was the least recently used
+    assert cache.get("two") is None
+    assert cache.get("one") == RESULT
+    assert cache.stats()["evictions"] == 1
+
+    cache.get("one")[0]["score"] = 0.0
+    assert cache.get("one") == RESULT
+
+
+def test_empty_results_are_not_cached():
+    cache = EmotionCache("model-a")
+    cache.put("blank", [])
+    assert cache.get("blank") is None
+
+
+def test_sqlite_tier_is_shared(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    EmotionCache("model-a", sqlite_path=path).put("Hello world", RESULT)
+
+    other = EmotionCache("model-a", max_entries=10, sqlite_path=path)
+    assert other.get_many(["Hello  world", "unknown"]) == {"Hello  world": RESULT}
+    assert other.get("Hello world") == RESULT
+    stats = other.stats()
+    assert (stats["disk_hits"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_sqlite_tier_is_keyed_by_model(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    EmotionCache("model-a", sqlite_path=path).put("Hello", RESULT)
+    assert EmotionCache("model-b", sqlite_path=path).get("Hello") is None
+
+
+def test_model_identity_changes_with_weights(tmp_path):
+    (tmp_path / "config.json").write_text('{"num_labels": 2}')
+    weights = tmp_path / "model.bin"
+    weights.write_bytes(b"\0" * 8)
+    first = model_identity(str(tmp_path))
+    assert model_identity(str(tmp_path)) == first
+
+    # Exports under onnx/ do not change the identity
+    (tmp_path / "onnx").mkdir()
+    (tmp_path / "onnx" / "model.onnx").write_bytes(b"\0")
+    assert model_identity(str(tmp_path)) == first
+
+    weights.write_bytes(b"\0" * 16)
+    assert model_identity(str(tmp_path)) != first
+    (tmp_path / "config.json").write_text('{"num_labels": 3}')
+    os.utime(weights, (0, 0))
+    assert model_identity(str(tmp_path)) != first
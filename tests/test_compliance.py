@@ -0,0 +1,126 @@
+import pytest
+
+from compliance import ComplianceEngine, ComplianceRule, check_compliance, unseen_messages
+
+
+def _message(id, text, sender="agent"):
+    return {"id": id, "sender": sender, "text": text}
+
+
+def _summary(messages):
+    return {"messages": [{"message_id": message["id"], "emotions": []} for message in messages]}
+
+
+def test_incremental_analysis_after_single_message_scored():
+    analyzed = [_message(1, "Hello, how can I help?"), _message(2, "My order is late", "customer")]
+    rules, _ = check_compliance(analyzed)
+    assert rules["no_unsupported_claims"] is True
+
+    # Message 3 was scored on its own (POST /api/messages/<id>/analyze), so it has stored
+    # scores but was never folded into the conversation's rule state
+    messages = analyzed + [_message(3, "It is guaranteed to arrive tomorrow")]
+    unseen = unseen_messages(messages, _summary(analyzed))
+    assert [message["id"] for message in unseen] == [3]
+
+    folded = check_compliance(unseen, rules, messages[0])
+    assert folded[0]["no_unsupported_claims"] is False
+    assert folded == check_compliance(messages)
+
+
+def test_unseen_messages_needs_full_pass_without_record():
+    messages = [_message(1, "Hello"), _message(2, "Hi", "customer")]
+    assert unseen_messages(messages, None) is None
+    assert unseen_messages(messages, {"emotions": []}) is None
+    assert unseen_messages(messages, _summary(messages[1:])) is None
+    assert unseen_messages(messages, _summary(messages)) == []
+
+
+def _engine(*rules):
+    return ComplianceEngine(list(rules))
+
+
+def test_keywords_match_whole_words_only():
+    engine = _engine(ComplianceRule("resolution", ["fixed", "working"]))
+    assert engine.evaluate([_message(1, "It is fixed now.")])[0] == {"resolution": True}
+    assert engine.evaluate([_message(1, "The prefixed value, unfixedness")])[0] == {"resolution": False}
+    assert engine.evaluate([_message(1, "Working on it")])[0] == {"resolution": True}
+
+
+def test_wildcard_matches_word_endings():
+    engine = _engine(ComplianceRule("claims", ["guarantee*"], negate=True))
+    assert engine.evaluate([_message(1, "It's guaranteed.")])[0] == {"claims": False}
+    assert engine.evaluate([_message(1, "We guarantee it")])[0] == {"claims": False}
+    assert engine.evaluate([_message(1, "No guarantor involved")])[0] == {"claims": True}
+
+
+def test_case_sensitive_rules():
+    engine = _engine(ComplianceRule("personalization", ["Alex"], case_sensitive=True),
+                     ComplianceRule("apology", ["sorry"]))
+    rules, score = engine.evaluate([_message(1, "alex, SORRY about that")])
+    assert rules == {"personalization": False, "apology": True}
+    assert score == 50
+
+
+def test_one_scan_reports_overlapping_rules():
+    # "never fails" and "sorry" share no position, but both must be found in one message
+    engine = _engine(ComplianceRule("apology", ["sorry"]),
+                     ComplianceRule("claims", ["never fails", "forever"], negate=True),
+                     ComplianceRule("resolution", ["fails to"]))
+    rules, _ = engine.evaluate([_message(1, "Sorry, it never fails to work")])
+    assert rules == {"apology": True, "claims": False, "resolution": True}
+
+
+def test_only_sender_messages_count():
+    engine = _engine(ComplianceRule("apology", ["sorry"]))
+    assert engine.evaluate([_message(1, "sorry", sender="customer")])[0] == {"apology": False}
+
+
+def test_first_message_scope():
+    engine = _engine(ComplianceRule("greeting", ["hello"], scope="first_message"))
+    assert engine.evaluate([_message(1, "Hello there")])[0] == {"greeting": True}
+    assert engine.evaluate([_message(1, "Good morning"), _message(2, "hello")])[0] == {"greeting": False}
+
+
+@pytest.mark.parametrize("first, second", [
+    (["sorry"], ["sorry"]),
+    (["never"], ["never fails"]),
+    (["guarantee*"], ["guaranteed"]),
+])
+def test_conflicting_keywords_are_rejected(first, second):
+    with pytest.raises(ValueError):
+        _engine(ComplianceRule("a", first), ComplianceRule("b", second))
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        ComplianceRule("empty", [])
+    with pytest.raises(ValueError):
+        ComplianceRule("scoped", ["hi"], scope="last_message")
+    with pytest.raises(ValueError):
+        _engine(ComplianceRule("a", ["x"]), ComplianceRule("a", ["y"]))
+
+
+def test_rules_latch_when_folding():
+    engine = _engine(ComplianceRule("greeting", ["hello"], scope="first_message"),
+                     ComplianceRule("apology", ["sorry"]),
+                     ComplianceRule("claims", ["always"], negate=True))
+    messages = [_message(1, "Hello"), _message(2, "We always fix it"), _message(3, "Sorry!"), _message(4, "ok")]
+    full = engine.evaluate(messages)
+
+    state = engine.evaluate(messages[:1])
+    for message in messages[1:]:
+        state = engine.evaluate([message], state[0], messages[0])
+    assert state == full
+    assert full[0] == {"greeting": True, "apology": True, "claims": False}
+
+
+@pytest.mark.parametrize("earlier, expected", [("It always works", False), ("It works", True)])
+def test_rule_added_after_analysis_sees_earlier_messages(earlier, expected):
+    apology = ComplianceRule("apology", ["sorry"])
+    messages = [_message(1, "Sorry for the wait"), _message(2, earlier), _message(3, "Anything else?")]
+    previous, _ = _engine(apology).evaluate(messages[:2])
+
+    engine = _engine(apology, ComplianceRule("claims", ["always"], negate=True))
+    folded = engine.evaluate(messages[2:], previous, messages[0], history=messages[:2])
+    assert folded[0]["claims"] is expected
+    assert folded == engine.evaluate(messages)
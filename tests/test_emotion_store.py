@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+import emotion_store
+
+
+def test_decode_many_mixed_dtypes():
+    labels = ["joy", "anger"]
+    rows = [
+        (np.array([0.75, 0.25], dtype=np.float16).tobytes(), None),
+        None,
+        (np.array([0.5, 0.5], dtype=np.float32).tobytes(), None),
+        (None, [{"label": "anger", "score": 0.9}]),
+    ]
+    matrix = emotion_store.decode_many(rows, labels)
+    np.testing.assert_allclose(matrix, [[0.75, 0.25], [0, 0], [0.5, 0.5], [0, 0.9]])
+
+
+def test_decode_many_without_labels():
+    rows = [(np.array([0.5, 0.5], dtype=np.float32).tobytes(), None), None]
+    assert emotion_store.decode_many(rows, []).shape == (2, 0)
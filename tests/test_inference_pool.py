@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+
+from inference_pool import InferencePool, InferenceWorkerError, _Request, _Worker
+
+
+class _Process:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.exitcode = None if alive else 1
+        self.pid = 1000
+
+    def is_alive(self):
+        return self.alive
+
+    def kill(self):
+        self.alive = False
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A pool with fake worker processes; spawning just starts a new live fake."""
+    pool = InferencePool(1, 3, restart_backoff=1.0, max_restart_backoff=3.0, max_restarts=3)
+    pool._pid = os.getpid()
+    pool._pending = {}
+    pool._free_slots = [0]
+    pool._workers = [_Worker(0)]
+    pool._workers[0].process = _Process()
+    pool._workers[0].ready = True
+    pool.spawned = 0
+
+    def spawn(worker):
+        pool.spawned += 1
+        worker.process = _Process()
+        worker.ready = False
+    monkeypatch.setattr(pool, "_spawn", spawn)
+    return pool
+
+
+def _advance(monkeypatch, seconds):
+    now = time.monotonic() + seconds
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+
+def test_dead_worker_is_restarted_after_a_doubling_backoff(pool, monkeypatch):
+    worker = pool._workers[0]
+    delays = []
+    for failures in range(1, 4):
+        worker.process.alive = False
+        pool._check_workers()
+        assert worker.failures == failures
+        delays.append(worker.retry_at - time.monotonic())
+        pool._check_workers()
+        assert pool.spawned == failures - 1
+        _advance(monkeypatch, delays[-1] + 0.1)
+        pool._check_workers()
+        assert pool.spawned == failures
+    assert [round(delay) for delay in delays] == [1, 2, 3]
+    assert worker.restarts == 3
+
+
+def test_worker_that_never_loads_is_marked_failed(pool, monkeypatch):
+    worker = pool._workers[0]
+    for _ in range(pool.max_restarts + 1):
+        worker.process.alive = False
+        pool._check_workers()
+        _advance(monkeypatch, pool.max_restart_backoff + 0.1)
+        pool._check_workers()
+
+    assert worker.failed
+    assert pool.spawned == pool.max_restarts
+    assert not pool.ready
+    assert pool.health()["workers"][0]["failed"]
+    with pytest.raises(InferenceWorkerError):
+        pool._submit("texts", ["hello"])
+    assert pool._free_slots == [0]
+
+
+def test_becoming_ready_resets_the_failure_count(pool, monkeypatch):
+    worker = pool._workers[0]
+    worker.process.alive = False
+    pool._check_workers()
+    _advance(monkeypatch, 1.1)
+    pool._check_workers()
+    assert worker.failures == 1 and not pool.ready
+
+    pool._handle(worker, "ready", None, 1234)
+    assert worker.failures == 0
+    assert pool.ready
+
+
+def test_crashed_worker_fails_its_requests(pool):
+    worker = pool._workers[0]
+    request_id, request = 7, _Request(0, 1, worker)
+    pool._pending[request_id] = request
+    worker.inflight.add(request_id)
+
+    worker.process.alive = False
+    pool._check_workers()
+    assert request.done.is_set()
+    assert "crashed" in request.error
+    assert not worker.inflight
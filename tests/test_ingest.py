@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+import ingest
+from models import Conversation, Message
+
+TRICKY_TEXTS = [
+    'He said "it\'s broken", then hung up',
+    "Line one\nline two, with a comma",
+    "",
+    "Backslash \\N is not NULL",
+    "Tab\tand \r carriage return",
+]
+
+
+def _item(external_id, texts, created_at="2024-03-04T09:00:00"):
+    return {"external_id": external_id, "created_at": created_at,
+            "messages": [{"sender": "agent", "text": text} for text in texts]}
+
+
+def test_copy_keeps_text_exactly(session):
+    [result] = ingest.ingest_batch([_item("call-1", TRICKY_TEXTS)])
+    assert result["status"] == "created"
+    conversation = Conversation.query.get(result["id"])
+    assert [msg.text for msg in conversation.messages] == TRICKY_TEXTS
+    assert conversation.message_count == len(TRICKY_TEXTS)
+    assert conversation.last_message_at == conversation.messages[-1].timestamp
+
+
+def test_ingest_is_idempotent_on_external_id(session):
+    first = list(ingest.ingest([_item("call-1", ["a"]), _item("call-2", ["b", "c"])], batch_size=1))
+    again = list(ingest.ingest([_item("call-2", ["b", "c"]), _item("call-3", ["d"]), {"external_id": ""}], batch_size=2))
+
+    assert [result["status"] for result in first] == ["created", "created"]
+    assert [result.get("status", "error") for result in again] == ["existing", "created", "error"]
+    assert again[0]["id"] == first[1]["id"]
+    assert [result["index"] for result in again] == [0, 1, 2]
+    assert Conversation.query.count() == 3
+    assert Message.query.count() == 4
+
+
+def test_duplicate_in_batch_is_reported(session):
+    results = ingest.ingest_batch([_item("call-1", ["a"]), _item("call-1", ["b"])])
+    assert results[0]["status"] == "created"
+    assert results[1]["error"] == "Duplicate 'external_id' in batch"
+    assert Message.query.count() == 1
+
+
+def test_bulk_route_counts(client):
+    body = {"conversations": [_item("call-1", ["a"]), _item("call-2", ["b"])]}
+    response = client.post("/api/conversations/bulk", json=body)
+    assert response.status_code == 201
+    assert (response.get_json()["created"], response.get_json()["existing"]) == (2, 0)
+
+    body["conversations"].append({"external_id": "call-3", "messages": "not a list"})
+    response = client.post("/api/conversations/bulk", json=body)
+    counts = response.get_json()
+    assert response.status_code == 200
+    assert (counts["created"], counts["existing"], counts["errors"]) == (0, 2, 1)
+
+
+def test_bulk_route_streams_ndjson(client):
+    lines = [json.dumps(_item("call-1", ["a"])), "{broken", json.dumps(_item("call-1", ["a"]))]
+    response = client.post("/api/conversations/bulk?stream=true", data="\n".join(lines),
+                           content_type="application/x-ndjson")
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [result.get("status", "error") for result in results] == ["created", "error", "error"]
+    assert results[2]["error"] == "Duplicate 'external_id' in batch"
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+import jobs
+from models import db, AnalysisJob, AnalysisResult, AnalyticsDailyRollup
+
+TURNS = [("agent", "Hello, sorry for the wait"), ("customer", "Thanks")]
+
+
+class _Runner(jobs.JobRunner):
+    def __init__(self, name, stale_seconds=300):
+        super().__init__(poll_interval=0, stale_seconds=stale_seconds)
+        self.name = name
+
+    @property
+    def worker_id(self):
+        return self.name
+
+
+@pytest.fixture
+def conversations(make_conversation):
+    created_at = datetime(2024, 3, 4, 9, 0)
+    made = [make_conversation(TURNS, created_at + timedelta(minutes=i)) for i in range(4)]
+    # Nothing to analyze: counted as failed, not written
+    made.append(make_conversation([("agent", "   ")], created_at + timedelta(minutes=5)))
+    # Ids only: process_chunk expunges the session
+    return [conversation.id for conversation in made]
+
+
+def _rollup_count():
+    return AnalyticsDailyRollup.query.get(datetime(2024, 3, 4).date()).conversation_count
+
+
+def _job(chunk_size=2):
+    return jobs.create_job(chunk_size=chunk_size).id
+
+
+def _reload(job_id):
+    db.session.expire_all()
+    return AnalysisJob.query.get(job_id)
+
+
+def test_job_runs_to_completion(session, model, conversations):
+    job_id = _job()
+    runner = _Runner("a")
+    assert runner.claim() == job_id
+    runner.execute(job_id)
+
+    job = _reload(job_id)
+    assert (job.status, job.processed, job.failed, job.total) == ("completed", 4, 1, 5)
+    assert job.last_conversation_id == conversations[-1]
+    assert AnalysisResult.query.count() == 4
+    assert _rollup_count() == 4
+
+
+@pytest.mark.parametrize("change", [{"worker": "b"}, {"status": "cancelled"}])
+def test_chunk_is_discarded_when_ownership_is_lost(session, model, conversations, change):
+    job_id = _job()
+    runner = _Runner("a")
+    runner.claim()
+    # Another runner reclaimed the job, or it was cancelled, while the chunk was in flight
+    AnalysisJob.query.filter_by(id=job_id).update(change)
+    session.commit()
+
+    with pytest.raises(jobs.JobOwnershipLost):
+        jobs.process_chunk(job_id, "a")
+    job = _reload(job_id)
+    assert (job.processed, job.last_conversation_id) == (0, 0)
+    assert AnalysisResult.query.count() == 0
+
+    # The runner stops without marking the job finished
+    runner.execute(job_id)
+    assert _reload(job_id).status == change.get("status", "running")
+
+
+def test_stale_job_is_reclaimed_and_resumed(session, model, conversations):
+    job_id = _job()
+    crashed, other = _Runner("a"), _Runner("b", stale_seconds=60)
+    crashed.claim()
+    assert jobs.process_chunk(job_id, "a") == 2
+
+    # A fresh heartbeat keeps the job with its runner
+    assert other.claim() is None
+    AnalysisJob.query.filter_by(id=job_id).update({"heartbeat_at": datetime.utcnow() - timedelta(minutes=5)})
+    session.commit()
+    assert other.claim() == job_id
+    job = _reload(job_id)
+    assert (job.worker, job.run_processed, job.total) == ("b", 2, 5)
+
+    other.execute(job_id)
+    job = _reload(job_id)
+    assert (job.status, job.processed, job.failed) == ("completed", 4, 1)
+    # The chunk committed before the crash is not counted twice
+    assert _rollup_count() == 4
+
+
+def test_claim_skips_finished_jobs(session, conversations):
+    job_id = _job()
+    AnalysisJob.query.filter_by(id=job_id).update({"status": "completed"})
+    session.commit()
+    assert _Runner("a").claim() is None
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+import live
+from models import AnalysisResult, Message
+
+
+@pytest.fixture
+def calls(app, session, model, monkeypatch):
+    calls = live.LiveCalls(max_wait_ms=1, flush_interval=3600)
+    # No background flusher; the tests flush through end()
+    calls._flusher_pid = os.getpid()
+    monkeypatch.setattr(live, "calls", calls)
+    return calls
+
+
+def _fail(batch):
+    raise RuntimeError("database unavailable")
+
+
+def test_end_writes_pending_turns(app, calls, session):
+    call = calls.start(app)
+    calls.add_turn(call.conversation_id, "agent", "Hello, how can I help?")
+    calls.add_turn(call.conversation_id, "customer", "It is broken!")
+
+    update = calls.end(call.conversation_id)
+
+    assert update["type"] == "end"
+    assert Message.query.filter_by(conversation_id=call.conversation_id).count() == 2
+    assert AnalysisResult.query.filter_by(conversation_id=call.conversation_id).one().compliance_summary == call.rules
+    with pytest.raises(live.CallNotLive):
+        calls.get(call.conversation_id)
+
+
+def test_end_keeps_call_when_write_fails(app, calls, session, monkeypatch):
+    call = calls.start(app)
+    calls.add_turn(call.conversation_id, "agent", "Hello, how can I help?")
+    monkeypatch.setattr(calls, "_write", _fail)
+
+    with pytest.raises(RuntimeError):
+        calls.end(call.conversation_id)
+    assert calls.get(call.conversation_id) is call
+    assert len(call.pending) == 1
+
+    # Once the database is back, ending again writes the kept turn
+    monkeypatch.delattr(calls, "_write")
+    calls.end(call.conversation_id)
+    assert Message.query.filter_by(conversation_id=call.conversation_id).count() == 1
+
+
+def test_end_route_reports_failed_write(app, calls, client, monkeypatch):
+    call = calls.start(app)
+    calls.add_turn(call.conversation_id, "agent", "Hello, how can I help?")
+    monkeypatch.setattr(calls, "_write", _fail)
+
+    response = client.post(f"/api/live/calls/{call.conversation_id}/end")
+
+    assert response.status_code == 500
+    assert calls.get(call.conversation_id) is call
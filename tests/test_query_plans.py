@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from benchmarks.plans import HOT_QUERIES, check_plans, seed
+
+
+@pytest.fixture
+def seeded(session):
+    seed(300, batch_size=100)
+    return session
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_its_index(seeded, name):
+    assert check_plans({name: HOT_QUERIES[name]}, prefer_indexes=True) == {}
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+import response_cache
+from models import db, Message
+
+TURNS = [("agent", "Hello, how can I help?"), ("customer", "It is broken!")]
+
+
+def _scope_version(conversation_id):
+    return response_cache.current_version(response_cache.conversation_scope(conversation_id))
+
+
+def test_matching_etag_gets_304(client, make_conversation):
+    conversation = make_conversation(TURNS)
+    url = f"/api/conversations/{conversation.id}"
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+
+    revalidated = client.get(url, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+    # Without the validator the body is replayed from the cache
+    again = client.get(url)
+    assert again.get_data() == first.get_data()
+    assert response_cache.cache.stats()["entries"] == 1
+
+
+def test_commit_bumps_the_touched_scopes(client, session, make_conversation):
+    conversation = make_conversation(TURNS)
+    other = make_conversation(TURNS)
+    url = f"/api/conversations/{conversation.id}"
+    etag = client.get(url).headers["ETag"]
+    other_version = _scope_version(other.id)
+    analytics_version = response_cache.current_version(response_cache.ANALYTICS_SCOPE)
+
+    session.add(Message(conversation_id=conversation.id, sender="agent", text="Anything else?",
+                        timestamp=conversation.last_message_at + timedelta(seconds=1)))
+    session.commit()
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.get_json()["messages"]) == 3
+    assert _scope_version(other.id) == other_version
+    assert response_cache.current_version(response_cache.ANALYTICS_SCOPE) == analytics_version
+
+
+def test_analysis_bumps_conversation_and_analytics(client, model, make_conversation):
+    conversation = make_conversation(TURNS)
+    analytics_version = response_cache.current_version(response_cache.ANALYTICS_SCOPE)
+    version = _scope_version(conversation.id)
+
+    assert client.post(f"/api/conversations/{conversation.id}/analyze").status_code == 200
+    assert _scope_version(conversation.id) > version
+    assert response_cache.current_version(response_cache.ANALYTICS_SCOPE) > analytics_version
+
+
+def test_scoring_one_message_invalidates_its_conversation(client, model, make_conversation):
+    conversation = make_conversation(TURNS)
+    version = _scope_version(conversation.id)
+    assert client.post(f"/api/messages/{conversation.messages[0].id}/analyze").status_code == 200
+    assert _scope_version(conversation.id) > version
+
+
+def test_rollback_bumps_nothing(session, make_conversation):
+    conversation = make_conversation(TURNS)
+    version = _scope_version(conversation.id)
+    response_cache.invalidate(response_cache.conversation_scope(conversation.id))
+    session.add(Message(conversation_id=conversation.id, sender="agent", text="Discarded"))
+    session.flush()
+    session.rollback()
+    session.commit()
+    assert _scope_version(conversation.id) == version
+    assert "cache_scopes" not in db.session.info
@@ -0,0 +1,82 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+import rollups
+from models import AnalyticsDailyRollup, Message
+
+
+def _analysis(score, rules, emotions):
+    return SimpleNamespace(overall_compliance_score=score, compliance_summary=rules,
+                           emotion_summary={"emotions": [{"label": k, "score": v} for k, v in emotions.items()]})
+
+
+def test_snapshot():
+    snap = rollups.snapshot(_analysis(80, {"greeting": True, "apology": False}, {"joy": 0.5, "anger": 0.25}))
+    assert snap == {
+        "conversations": 1, "compliant": 1, "score_sum": 80, "histogram": {"61-80": 1},
+        "rule_violations": {"apology": 1}, "emotion_sums": {"joy": 0.5, "anger": 0.25},
+    }
+    assert rollups.snapshot(SimpleNamespace(overall_compliance_score=20, compliance_summary=None,
+                                            emotion_summary=None))["emotion_sums"] == {}
+
+
+def test_combine_sums_snapshots():
+    first = rollups.snapshot(_analysis(100, {"apology": False}, {"joy": 0.1}))
+    second = rollups.snapshot(_analysis(40, {"apology": False, "greeting": False}, {"joy": 0.2, "anger": 0.7}))
+    total = rollups.combine([first, None, second])
+    assert total["conversations"] == 2
+    assert total["compliant"] == 1
+    assert total["score_sum"] == 140
+    assert total["histogram"] == {"81-100": 1, "21-40": 1}
+    assert total["rule_violations"] == {"apology": 2, "greeting": 1}
+    assert total["emotion_sums"] == {"joy": pytest.approx(0.3), "anger": 0.7}
+    assert rollups.combine([]) is None
+
+
+@pytest.mark.parametrize("score, bucket", [(0, "0-20"), (20, "0-20"), (21, "21-40"), (80, "61-80"), (100, "81-100")])
+def test_score_bucket(score, bucket):
+    assert rollups.score_bucket(score) == bucket
+
+
+def test_bucket_start():
+    sunday = date(2024, 3, 10)
+    assert rollups.bucket_start(sunday, "day") == sunday
+    assert rollups.bucket_start(sunday, "week") == date(2024, 3, 4)
+    assert rollups.bucket_start(date(2024, 3, 4), "week") == date(2024, 3, 4)
+    assert rollups.bucket_start(sunday, "month") == date(2024, 3, 1)
+
+
+def _row(day):
+    row = AnalyticsDailyRollup.query.get(day)
+    return row and {
+        "conversations": row.conversation_count, "compliant": row.compliant_count, "score_sum": row.score_sum,
+        "histogram": {k: v for k, v in row.score_histogram.items() if v},
+        "rule_violations": {k: v for k, v in row.rule_violations.items() if v},
+        "emotion_sums": {k: round(v, 4) for k, v in row.emotion_sums.items() if v},
+    }
+
+
+def test_reanalysis_replaces_snapshot(client, session, model, make_conversation):
+    created = datetime(2024, 3, 4, 9, 0)
+    conversation = make_conversation([("agent", "Hello, how can I help?"), ("customer", "It is broken!")], created)
+    other = make_conversation([("agent", "Hi, sorry, it is fixed"), ("customer", "Thanks")], created + timedelta(hours=1))
+    for analyzed in (conversation, other):
+        assert client.post(f"/api/conversations/{analyzed.id}/analyze").status_code == 200
+    first = _row(created.date())
+    assert first["conversations"] == 2
+
+    session.add(Message(conversation_id=conversation.id, sender="agent", text="Sorry, it is fixed now",
+                        timestamp=created + timedelta(minutes=5)))
+    session.commit()
+    assert client.post(f"/api/conversations/{conversation.id}/analyze").status_code == 200
+    maintained = _row(created.date())
+    assert maintained["conversations"] == 2
+    assert maintained["score_sum"] > first["score_sum"]
+
+    # Maintained incrementally, the row matches one rebuilt from every analysis
+    rollups.rebuild()
+    assert _row(created.date()) == maintained
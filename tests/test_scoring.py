@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from conftest import fake_scores
+from models import db, MessageEmotion
+from scoring import summarize_emotions, summarize_many
+
+TURNS = [("agent", "Hello, how can I help?"), ("customer", "It is broken!"), ("customer", "Thanks")]
+
+
+def test_stored_vectors_are_reused(session, model, make_conversation, monkeypatch):
+    conversation = make_conversation(TURNS)
+    first, scored = summarize_emotions(conversation.messages, "mean")
+    session.commit()
+    assert len(scored) == 3
+
+    monkeypatch.setattr(model, "message_scores", lambda texts: pytest.fail("rescored stored messages"))
+    again, scored = summarize_emotions(conversation.messages, "mean")
+    assert scored == []
+    assert again == first
+    assert [item["message_id"] for item in again["messages"]] == [msg.id for msg in conversation.messages]
+
+
+def test_concurrent_scoring_does_not_collide(session, model, make_conversation, monkeypatch):
+    conversation = make_conversation(TURNS)
+    target = conversation.messages[1]
+
+    def scores_after_concurrent_writer(texts):
+        # Another request stores the same message between our read and our write
+        with db.engine.begin() as connection:
+            connection.execute(MessageEmotion.__table__.insert().values(
+                message_id=target.id, model_version="test-model", probs=np.zeros(3, np.float32).tobytes(),
+                token_count=1, created_at=conversation.created_at))
+        return fake_scores(texts)
+
+    monkeypatch.setattr(model, "message_scores", scores_after_concurrent_writer)
+    summary, _ = summarize_emotions(conversation.messages, "max")
+    session.commit()
+
+    assert MessageEmotion.query.count() == 3
+    stored = MessageEmotion.query.get((target.id, "test-model"))
+    np.testing.assert_allclose(np.frombuffer(stored.probs, dtype=np.float16), [0.1, 0.8, 0.1], atol=1e-3)
+    assert {item["label"]: item["score"] for item in summary["emotions"]}["anger"] == pytest.approx(0.8, abs=1e-3)
+
+
+def test_full_rescores_every_message(session, model, make_conversation):
+    first = make_conversation(TURNS)
+    second = make_conversation(TURNS[:1])
+    summarize_many([first.messages], "mean")
+    session.commit()
+
+    results = summarize_many([first.messages, second.messages], "mean", full=True)
+    session.commit()
+    assert [len(scored) for _, scored in results] == [3, 1]
+    assert MessageEmotion.query.count() == 4